@@ -1,8 +1,7 @@
 import json
 import os
-import datetime
-import pytz
-from icalendar import Calendar, Event
+import heapq
+from utils.ics_writer import ICSWriter
 
 # Load study schedule
 def load_study_schedule(schedule_file):
@@ -14,21 +13,36 @@ def load_canvas_assignments(assignments_file):
     with open(assignments_file, 'r') as f:
         return json.load(f)
 
+# Index assignments by due date: one heap per YYYY-MM-DD, earliest due time
+# first, then most points, then original order
+def index_assignments(assignments):
+    by_date = {}
+    for index, assignment in enumerate(assignments):
+        due_at = assignment.get('due_at')
+        if not due_at:
+            continue  # Undated assignments can't be placed on a study day
+        points = assignment.get('points_possible') or 0
+        by_date.setdefault(due_at[:10], []).append((due_at, -points, index, assignment['name']))
+    for heap in by_date.values():
+        heapq.heapify(heap)
+    return by_date
+
 # Merge study schedule with assignments
 def merge_schedule_with_assignments(study_schedule, assignments):
+    """
+    Give each study slot the next assignment due that day, or 'Self Study'.
+
+    Each slot costs one dict lookup plus a heap pop, and neither input is
+    modified (the heaps hold references to assignment names only).
+    """
     merged_schedule = []
-    
+    due_by_date = index_assignments(assignments)
+
     for date, time_slots in study_schedule['schedule'].items():
+        due_today = due_by_date.get(date)
         for time, is_study_time in time_slots.items():
             if is_study_time:
-                assigned_task = None
-                for assignment in assignments:
-                    due_date = assignment['due_at'][:10]  # Extract YYYY-MM-DD
-                    if date == due_date:
-                        assigned_task = assignment['name']
-                        assignments.remove(assignment)
-                        break
-                
+                assigned_task = heapq.heappop(due_today)[3] if due_today else None
                 merged_schedule.append({
                     'date': date,
                     'time': time,
@@ -48,21 +62,17 @@ def add_manual_topics(merged_schedule):
     return merged_schedule
 
 # Export to .ICS file
-def export_to_ics(merged_schedule, filename="study_schedule.ics"):
-    cal = Calendar()
-    timezone = pytz.timezone("America/Toronto")  # Change as needed
-    
-    for entry in merged_schedule:
-        event = Event()
-        event.add('summary', entry['task'])
-        event_date = datetime.datetime.strptime(f"{entry['date']} {entry['time']}", "%Y-%m-%d %I:%M %p")
-        event.add('dtstart', timezone.localize(event_date))
-        event.add('dtend', timezone.localize(event_date + datetime.timedelta(minutes=30)))
-        cal.add_component(event)
-    
-    with open(filename, 'wb') as f:
-        f.write(cal.to_ical())
-    print(f"ICS file created: {filename}")
+def export_to_ics(merged_schedule, filename="study_schedule.ics", incremental=False):
+    """
+    Stream the merged schedule to an .ics file. With incremental=True only the
+    events that changed since the last export get a new SEQUENCE.
+    """
+    writer = ICSWriter(timezone="America/Toronto")  # Change as needed
+    events = ((entry['date'], entry['time'], entry['task']) for entry in merged_schedule)
+    counts = writer.write(events, filename, incremental=incremental)
+    print(f"ICS file created: {filename} ({counts['added']} added, {counts['changed']} changed, "
+          f"{counts['unchanged']} unchanged, {counts['removed']} removed)")
+    return counts
 
 # Main function
 def main():
@@ -71,7 +81,7 @@ def main():
     
     merged_schedule = merge_schedule_with_assignments(study_schedule, assignments)
     merged_schedule = add_manual_topics(merged_schedule)
-    export_to_ics(merged_schedule)
+    export_to_ics(merged_schedule, incremental=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,309 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+DEFAULT_SESSION = "default"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when its cancel event has been set"""
+    pass
+
+
+class SessionQueueFull(Exception):
+    """Raised by submit when a session already has its maximum number of queued jobs"""
+    pass
+
+
+class AnalysisJob:
+    """A unit of work queued on a JobManager."""
+    def __init__(self, fn, args, kwargs, session_id=DEFAULT_SESSION):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class SessionMetrics:
+    """Per-session counters reported by JobManager.stats()."""
+    def __init__(self):
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.finished_at = deque()  # completion times within the throughput window
+        self.last_active = time.time()
+
+    def to_dict(self, queued, running, window, now):
+        while self.finished_at and self.finished_at[0] < now - window:
+            self.finished_at.popleft()
+        finished = self.started - running
+        return {
+            "queued": queued,
+            "running": running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "avg_wait_seconds": self.wait_seconds / self.started if self.started else 0.0,
+            "avg_run_seconds": self.run_seconds / finished if finished else 0.0,
+            "throughput_per_minute": len(self.finished_at) * 60 / window,
+        }
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded pool of worker threads with fair queuing.
+
+    Every session has its own FIFO queue. Idle workers take the next job from
+    the sessions in round-robin order, so a session that submits many jobs
+    can't starve the others: each waiting session gets one job started per
+    rotation. A session never has more than one job running, since its jobs
+    share the session's change detector.
+
+    Per-session metrics are dropped once a session has been idle for
+    ``throughput_window`` seconds, or when it is removed.
+
+    Job functions receive the job's ``cancel_event`` as a keyword argument and are
+    expected to check it (or hand it to generation as a stopping criterion) and
+    raise JobCancelled when it is set.
+    """
+
+    def __init__(self, max_workers=1, max_history=100, max_queued_per_session=8, throughput_window=300):
+        """
+        :param max_workers: Number of jobs that can run at the same time.
+        :param max_history: Number of finished jobs kept for status polling.
+        :param max_queued_per_session: Queued (not yet running) jobs allowed per session.
+        :param throughput_window: Seconds over which per-session throughput is measured.
+        """
+        self.max_workers = max_workers
+        self.max_history = max_history
+        self.max_queued_per_session = max_queued_per_session
+        self.throughput_window = throughput_window
+        self._jobs = OrderedDict()
+        self._queues = OrderedDict()  # session_id -> deque of jobs, in round-robin order
+        self._metrics = {}
+        self._running = {}
+        self._cond = threading.Condition()
+        self._workers = [
+            threading.Thread(target=self._run, name=f"analysis-worker-{i}", daemon=True)
+            for i in range(max(1, max_workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue ``fn(*args, cancel_event=..., **kwargs)`` in the default session and return the job."""
+        return self.submit_to(DEFAULT_SESSION, fn, *args, **kwargs)
+
+    def submit_to(self, session_id, fn, *args, **kwargs):
+        """
+        Queue ``fn(*args, cancel_event=..., **kwargs)`` for a session and return the job immediately.
+        Raises:
+            SessionQueueFull: If the session already has max_queued_per_session jobs waiting
+        """
+        job = AnalysisJob(fn, args, kwargs, session_id)
+        with self._cond:
+            pending = self._queues.setdefault(session_id, deque())
+            if len([j for j in pending if j.status == QUEUED]) >= self.max_queued_per_session:
+                raise SessionQueueFull(f"Session {session_id} already has {self.max_queued_per_session} queued jobs")
+            pending.append(job)
+            self._jobs[job.id] = job
+            metrics = self._metrics.setdefault(session_id, SessionMetrics())
+            metrics.submitted += 1
+            metrics.last_active = job.created_at
+            self._prune()
+            self._cond.notify()
+        logger.info(f"Queued job {job.id} for session {session_id}")
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def current(self, session_id=None):
+        """Return a running job (of ``session_id``, if given), or None."""
+        with self._cond:
+            for job in self._running.values():
+                if session_id is None or job.session_id == session_id:
+                    return job
+        return None
+
+    def cancel(self, job_id):
+        """
+        Request cancellation of a job.
+
+        :return: The job, or None if it does not exist.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        with self._cond:
+            if job.status == QUEUED:
+                # The worker skips it when dequeued
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                self._metrics.setdefault(job.session_id, SessionMetrics()).cancelled += 1
+        logger.info(f"Cancellation requested for job {job_id}")
+        return job
+
+    def remove_session(self, session_id):
+        """
+        Cancel a session's queued jobs, ask its running job to stop and forget
+        its queue and metrics.
+
+        :return: Number of jobs cancelled.
+        """
+        now = time.time()
+        cancelled = 0
+        with self._cond:
+            for job in self._queues.pop(session_id, ()):
+                if job.status == QUEUED:
+                    job.cancel_event.set()
+                    job.status = CANCELLED
+                    job.finished_at = now
+                    cancelled += 1
+            for job in self._running.values():
+                if job.session_id == session_id:
+                    job.cancel_event.set()
+                    cancelled += 1
+            self._metrics.pop(session_id, None)
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} job(s) of removed session {session_id}")
+        return cancelled
+
+    def queue_depth(self, session_id=None):
+        with self._cond:
+            queues = self._queues.values() if session_id is None else [self._queues.get(session_id, ())]
+            return sum(1 for pending in queues for job in pending if job.status == QUEUED)
+
+    def stats(self):
+        """Queue depth, wait/run times and throughput, overall and per session."""
+        now = time.time()
+        with self._cond:
+            sessions = {
+                session_id: metrics.to_dict(
+                    sum(1 for job in self._queues.get(session_id, ()) if job.status == QUEUED),
+                    sum(1 for job in self._running.values() if job.session_id == session_id),
+                    self.throughput_window, now)
+                for session_id, metrics in self._metrics.items()
+            }
+            oldest = min((job.created_at for pending in self._queues.values() for job in pending
+                          if job.status == QUEUED), default=None)
+            started = sum(metrics.started for metrics in self._metrics.values())
+            waited = sum(metrics.wait_seconds for metrics in self._metrics.values())
+        return {
+            "workers": self.max_workers,
+            "running": sum(m["running"] for m in sessions.values()),
+            "queue_depth": sum(m["queued"] for m in sessions.values()),
+            "oldest_wait_seconds": now - oldest if oldest is not None else 0.0,
+            "avg_wait_seconds": waited / started if started else 0.0,
+            "throughput_per_minute": sum(m["throughput_per_minute"] for m in sessions.values()),
+            "sessions": sessions,
+        }
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.status in (COMPLETED, FAILED, CANCELLED)]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+
+        active = set(self._queues) | {job.session_id for job in self._running.values()}
+        cutoff = time.time() - self.throughput_window
+        for session_id in [session_id for session_id, metrics in self._metrics.items()
+                           if session_id not in active and metrics.last_active < cutoff]:
+            del self._metrics[session_id]
+
+    def _next_job(self):
+        """
+        Pop the next job round-robin across sessions that have nothing running;
+        caller holds the lock.
+        """
+        busy = {job.session_id for job in self._running.values()}
+        for session_id in list(self._queues):
+            pending = self._queues[session_id]
+            while pending and pending[0].status == CANCELLED:
+                pending.popleft()
+            if not pending:
+                del self._queues[session_id]
+                continue
+            if session_id in busy:
+                continue
+            job = pending.popleft()
+            # This session goes to the back of the rotation
+            self._queues.move_to_end(session_id)
+            if not pending:
+                del self._queues[session_id]
+            return job
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._running[job.id] = job
+                metrics = self._metrics.setdefault(job.session_id, SessionMetrics())
+                metrics.started += 1
+                metrics.wait_seconds += job.started_at - job.created_at
+            try:
+                result = job.fn(*job.args, cancel_event=job.cancel_event, **job.kwargs)
+                status, error = COMPLETED, None
+            except JobCancelled:
+                result, status, error = None, CANCELLED, None
+                logger.info(f"Job {job.id} cancelled")
+            except Exception as e:
+                result, status, error = None, FAILED, str(e)
+                logger.error(f"Job {job.id} failed: {e}")
+
+            with self._cond:
+                del self._running[job.id]
+                job.result = result
+                job.error = error
+                job.status = status
+                job.finished_at = time.time()
+                setattr(metrics, status, getattr(metrics, status) + 1)
+                metrics.run_seconds += job.finished_at - job.started_at
+                metrics.finished_at.append(job.finished_at)
+                metrics.last_active = job.finished_at
+                # The session may have more jobs waiting for this one to finish
+                self._cond.notify_all()
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from utils.screen_change import ScreenChangeDetector
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisSession:
+    """
+    Pipeline state of one user: the study topic, the procrastination
+    definition built from it, and the change detector holding the last frame
+    and verdict, so sessions never reuse each other's results.
+    """
+
+    def __init__(self, session_id, topic, change_threshold=10):
+        self.id = session_id
+        self.topic = topic
+        self.created_at = time.time()
+        self.last_active = self.created_at
+        self.change_detector = ScreenChangeDetector(threshold=change_threshold)
+        self._definition = None
+        self._definition_topic = None
+        self._lock = threading.Lock()
+
+    def set_topic(self, topic):
+        with self._lock:
+            if topic != self.topic:
+                self.topic = topic
+                self.change_detector.reset()
+            self.last_active = time.time()
+
+    def definition(self, create_definition):
+        """The definition for the current topic, built once per topic with ``create_definition``."""
+        with self._lock:
+            if self._definition_topic != self.topic:
+                self._definition = create_definition(self.topic)
+                self._definition_topic = self.topic
+            return self._definition
+
+    def to_dict(self):
+        return {
+            "session_id": self.id,
+            "topic": self.topic,
+            "created_at": self.created_at,
+            "last_active": self.last_active,
+            "change_detector": self.change_detector.stats(),
+        }
+
+
+class SessionRegistry:
+    """In-memory sessions, evicting the least recently active beyond ``max_sessions``."""
+
+    def __init__(self, max_sessions=100):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, topic, session_id=None):
+        session = AnalysisSession(session_id or uuid.uuid4().hex, topic)
+        with self._lock:
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                logger.info(f"Evicted idle session {evicted}")
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def get_or_create(self, session_id, topic):
+        """Return the session with its topic updated, creating it if needed."""
+        session = self.get(session_id)
+        if session is None:
+            return self.create(topic, session_id)
+        session.set_topic(topic)
+        return session
+
+    def remove(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
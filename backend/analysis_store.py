@@ -0,0 +1,175 @@
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    verdict INTEGER NOT NULL,
+    content TEXT,
+    justification TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_timestamp ON analyses (timestamp);
+
+CREATE TABLE IF NOT EXISTS imported_files (
+    filename TEXT PRIMARY KEY
+);
+"""
+
+
+def _rows(analyses):
+    return [(a["Timestamp"], int(bool(a.get("Verdict"))), a.get("Content"), a.get("Justification"))
+            for a in analyses]
+
+
+def _time_range(start, end):
+    """WHERE clause and arguments for start <= timestamp < end."""
+    clauses, args = [], []
+    if start:
+        clauses.append("timestamp >= ?")
+        args.append(start)
+    if end:
+        clauses.append("timestamp < ?")
+        args.append(end)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), args
+
+
+class AnalysisStore:
+    """
+    Append-only SQLite log of analysis results, indexed by timestamp.
+
+    Rows are only ever inserted. Reads are range scans on the timestamp index,
+    so building a schedule costs O(rows in range) instead of opening every
+    analysis file ever written.
+    """
+
+    def __init__(self, db_path="analyses.db", legacy_dir=None):
+        """
+        :param db_path: SQLite database file.
+        :param legacy_dir: Directory of old analysis_*.json files to import (once per file).
+        """
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        if legacy_dir:
+            self.import_directory(legacy_dir)
+
+    def append(self, analyses):
+        """Append analysis dicts in the pipeline's format (Timestamp, Content, Justification, Verdict)."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO analyses (timestamp, verdict, content, justification) VALUES (?, ?, ?, ?)",
+                _rows(analyses)
+            )
+
+    def range(self, start=None, end=None):
+        """
+        Return analyses with start <= Timestamp < end, oldest first.
+
+        :param start: Inclusive lower bound, "YYYY-MM-DD[ HH:MM:SS]", or None.
+        :param end: Exclusive upper bound in the same format, or None.
+        """
+        where, args = _time_range(start, end)
+        sql = f"SELECT timestamp, content, justification, verdict FROM analyses{where} ORDER BY timestamp"
+        with self.lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        return [
+            {"Timestamp": ts, "Content": content, "Justification": justification, "Verdict": bool(verdict)}
+            for ts, content, justification, verdict in rows
+        ]
+
+    def verdicts(self, start=None, end=None):
+        """Like range() but only (Timestamp, Verdict) pairs, for callers that don't need the text."""
+        where, args = _time_range(start, end)
+        sql = f"SELECT timestamp, verdict FROM analyses{where} ORDER BY timestamp"
+        with self.lock:
+            return [(ts, bool(verdict)) for ts, verdict in self.conn.execute(sql, args)]
+
+    def latest_justifications(self, limit, start=None, end=None):
+        """
+        Up to ``limit`` most recent distinct (Verdict, Justification) pairs,
+        alternating between productive and procrastination samples like
+        pick_justifications. Grouping scans the rows in range once per verdict.
+        """
+        where, args = _time_range(start, end)
+        where += (" AND " if where else " WHERE ") + "verdict = ? AND TRIM(justification) != ''"
+        sql = (f"SELECT verdict, TRIM(justification) AS text, MAX(timestamp) AS ts FROM analyses{where}"
+               " GROUP BY verdict, text ORDER BY ts DESC LIMIT ?")
+        by_verdict = {}
+        with self.lock:
+            for verdict in (False, True):
+                rows = self.conn.execute(sql, args + [int(verdict), limit])
+                by_verdict[verdict] = [(verdict, text) for _, text, _ in rows]
+        interleaved = [item for pair in zip(by_verdict[False], by_verdict[True]) for item in pair]
+        longer = by_verdict[False] if len(by_verdict[False]) > len(by_verdict[True]) else by_verdict[True]
+        interleaved += longer[len(interleaved) // 2:]
+        return interleaved[:limit]
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def import_directory(self, directory):
+        """
+        Import analysis JSON files that haven't been imported yet. A file is only
+        recorded as imported once it parses.
+
+        :return: Number of analyses imported.
+        """
+        if not os.path.isdir(directory):
+            return 0
+        with self.lock:
+            done = {row[0] for row in self.conn.execute("SELECT filename FROM imported_files")}
+
+        imported = 0
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json") or filename in done:
+                continue
+            file_path = os.path.join(directory, filename)
+            # Unreadable files are not recorded, so they are retried once fixed
+            if os.path.getsize(file_path) == 0:
+                logger.warning(f"Skipping empty file for now: {filename}")
+                continue
+            try:
+                with open(file_path, "r") as json_file:
+                    analyses = json.load(json_file)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping invalid JSON file for now: {filename}")
+                continue
+            # Older monitor runs wrote a single analysis object per file
+            if isinstance(analyses, dict):
+                analyses = [analyses]
+            elif not isinstance(analyses, list):
+                analyses = []
+
+            rows = _rows(a for a in analyses if isinstance(a, dict) and "Timestamp" in a)
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    "INSERT INTO analyses (timestamp, verdict, content, justification) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self.conn.execute("INSERT INTO imported_files (filename) VALUES (?)", (filename,))
+            imported += len(rows)
+
+        if imported:
+            logger.info(f"Imported {imported} analyses from {directory}")
+        return imported
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    # Migration: python analysis_store.py [analyses_dir] [db_path]
+    directory = sys.argv[1] if len(sys.argv) > 1 else "analyses"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "analyses.db"
+    store = AnalysisStore(db_path)
+    count = store.import_directory(directory)
+    print(f"Imported {count} analyses from {directory} into {db_path} ({store.count()} total)")
@@ -3,9 +3,15 @@ import logging
 import json
 import torch
 from datetime import datetime
+from functools import lru_cache
 import os
 import time
-from screenshot_taker import capture_screenshot
+import threading
+from concurrent.futures import CancelledError
+from screenshot_taker import CAPTURE_MODE, capture_frame
+from analysis_jobs import JobCancelled
+from analysis_store import AnalysisStore
+from transformers import StoppingCriteria, StoppingCriteriaList
 
 # Import the voice notification module
 from voice_notification import speak
@@ -23,7 +29,16 @@ from langchain_core.runnables import RunnablePassthrough
 from langchain_community.llms import Ollama as OllamaLLM
 
 # Import the InternVL model loader and cleanup helpers.
-from utils.internvl_loader import load_internvl_model, load_image, cleanup_model
+from utils.internvl_loader import count_generated_tokens, load_internvl_model, load_image
+from utils.model_manager import ModelManager
+from utils.inference_workers import InferenceWorkerPool
+from utils.screen_change import ScreenChangeDetector
+from utils.sampling_scheduler import AdaptiveSampler
+from utils.ocr_cache import OCRCache, ocr_cache_key
+from utils.verdict_classifier import RuleEngine, TieredClassifier
+from utils.ollama_client import OllamaStreamingClient
+from utils.pipeline_metrics import PipelineMetrics, PipelineTrace
+from PIL import Image
 
 # At the top of the file, update the logging configuration
 import logging
@@ -56,17 +71,73 @@ def create_definition(study_topic: str) -> str:
             f'Productive behavior includes activities related to studying/working on {study_topic}.'
             f'Do not include any other activities in your definition."}}')
 
+# Max dHash bit difference (out of 256) for a screenshot to count as unchanged
+CHANGE_THRESHOLD = 10
+
+# Skips InternVL + Llama when the screen hasn't changed since the last analysis
+change_detector = ScreenChangeDetector(threshold=CHANGE_THRESHOLD)
+
+# Time-indexed log of every analysis; older analysis_*.json files are imported once
+analysis_store = AnalysisStore("analyses.db", legacy_dir="analyses")
+
+# Monitoring loop pacing: fast right after a change, backing off to
+# SAMPLE_MAX_INTERVAL while stable, at most INFERENCE_BUDGET model-seconds per hour
+SAMPLE_MIN_INTERVAL = 15
+SAMPLE_MAX_INTERVAL = 300
+INFERENCE_BUDGET = 600
+
 
 # -------------------------------
-# Global Model Loading
+# Model Lifecycle
 # -------------------------------
-try:
-    # Load InternVL and its tokenizer
-    internvl_model, tokenizer, device, *_ = load_internvl_model()
-    logger.info("InternVL Model loaded successfully")
+# Seconds without an analysis before InternVL is released from memory
+MODEL_IDLE_TIMEOUT = 900
+
+# InternVL is loaded on first use and unloaded again when idle
+model_manager = ModelManager(load_internvl_model, idle_timeout=MODEL_IDLE_TIMEOUT, warmup=True)
+
+# The shared in-process model is not safe to call from several threads at once,
+# and parallel calls would each need their own activation memory
+generation_lock = threading.Lock()
+
+# With INFERENCE_WORKERS > 0, InternVL runs in that many separate processes
+# (INFERENCE_THREADS torch threads each) instead of in the API process
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0"))
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", "0")) or None
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+def get_worker_pool():
+    """The InternVL worker process pool, started on first use; None if disabled."""
+    global _worker_pool
+    if INFERENCE_WORKERS <= 0:
+        return None
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = InferenceWorkerPool(INFERENCE_WORKERS, threads_per_worker=INFERENCE_THREADS)
+        return _worker_pool
 
+OLLAMA_URL = "http://localhost:11434"
+
+CLASSIFICATION_TEMPLATE = (
+    "Analyze the following screenshot description:\n"
+    "{extracted_text}\n\n"
+    "Based on this definition of procrastination:\n"
+    "{definition}\n\n"
+    "Focus on analyzing the primary content of the screenshot. Be very strict with your analysis. Determine if the screenshot indicates procrastination or productive behavior, based on the definition of procrastination."
+    "Return your analysis as a JSON object with:\n"
+    "  - 'label': either 'procrastination' or 'productive'\n"
+    "  - 'reasoning': a brief explanation of your decision.\n\n"
+    "JSON Response:"
+)
+
+@lru_cache(maxsize=1)
+def get_classification_chain():
+    """
+    Builds the Llama (via Ollama) classification chain on first use.
+    """
     # Initialize Llama via Ollama 
-    llm = OllamaLLM(model="llama3", temperature=0.3)
+    llm = OllamaLLM(model="llama3", temperature=0.3, base_url=OLLAMA_URL)
     
     # Define output parser
     json_parser = JsonOutputParser()
@@ -74,56 +145,103 @@ try:
     # Define a prompt template for classification
     classification_prompt = PromptTemplate(
         input_variables=["extracted_text", "definition"],
-        template=(
-            "Analyze the following screenshot description:\n"
-            "{extracted_text}\n\n"
-            "Based on this definition of procrastination:\n"
-            "{definition}\n\n"
-            "Focus on analyzing the primary content of the screenshot. Be very strict with your analysis. Determine if the screenshot indicates procrastination or productive behavior, based on the definition of procrastination."
-            "Return your analysis as a JSON object with:\n"
-            "  - 'label': either 'procrastination' or 'productive'\n"
-            "  - 'reasoning': a brief explanation of your decision.\n\n"
-            "JSON Response:"
-        )
+        template=CLASSIFICATION_TEMPLATE
     )
 
     # Create modern chain
-    classification_chain = (
+    return (
         RunnablePassthrough() 
         | classification_prompt 
         | llm 
         | json_parser
     )
 
-except Exception as e:
-    logger.error(f"Error loading models: {e}")
-    raise
+# Streams the verdict and stops Llama as soon as 'label' and 'reasoning' are complete
+ollama_client = OllamaStreamingClient(model="llama3", base_url=OLLAMA_URL, temperature=0.3)
 
 # -------------------------------
 # Step 1: InternVL OCR Function
 # -------------------------------
-def internvl_ocr(image_path):
+OCR_PROMPT = "<image>\nPlease describe this screenshot in detail, focusing on any visible text content."
+OCR_GENERATION_CONFIG = dict(max_new_tokens=512, do_sample=True, temperature=0.7)
+
+# Largest number of screenshots sent through one batched generation
+MAX_OCR_BATCH_SIZE = 4
+
+# Descriptions of previously seen screens, in memory and under ocr_cache/
+ocr_cache = OCRCache("ocr_cache")
+
+# Per-stage timings and counters of every run_pipeline call, exported on /api/metrics
+pipeline_metrics = PipelineMetrics()
+
+class CancelStoppingCriteria(StoppingCriteria):
+    """Stops generation at the next decoding step once cancel_event is set."""
+    def __init__(self, cancel_event):
+        self.cancel_event = cancel_event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        stop = self.cancel_event.is_set()
+        return torch.full((input_ids.shape[0],), stop, dtype=torch.bool, device=input_ids.device)
+
+def check_cancelled(cancel_event):
+    """Raise JobCancelled if the (optional) cancel event is set."""
+    if cancel_event is not None and cancel_event.is_set():
+        raise JobCancelled()
+
+def internvl_ocr(image_path, cancel_event=None, trace=None):
     """
     Loads the image and uses InternVL to generate an image description.
     Focuses on extracting textual content from the screenshot.
     
-    :param image_path: Path to the screenshot image.
+    :param image_path: Path to the screenshot image, or the in-memory PIL image.
+    :param cancel_event: Optional threading.Event; setting it halts decoding.
+    :param trace: PipelineTrace receiving stage timings, tile and token counts.
     :return: A string description of the image.
     """
+    trace = trace or PipelineTrace()
     try:
         # Process image
-        pixel_values = load_image(image_path, max_num=12).to(torch.bfloat16).to(device)
-        
-        # Create text prompt
-        prompt = "<image>\nPlease describe this screenshot in detail, focusing on any visible text content."
+        with trace.stage("preprocess"):
+            pixel_values = load_image(image_path, max_num=12, dtype=torch.bfloat16, adaptive_max_num=True)
+        trace.count("tiles", pixel_values.size(0))
+
+        # Identical pixels + prompt + config have been described before
+        with trace.stage("ocr_cache"):
+            cache_key = ocr_cache_key(pixel_values, OCR_PROMPT, OCR_GENERATION_CONFIG)
+            cached = ocr_cache.get(cache_key)
+        if cached is not None:
+            logger.info("OCR cache hit")
+            trace.count("ocr_cache_hits")
+            return cached
+        trace.count("ocr_cache_misses")
         
         # Generate response
-        generation_config = dict(max_new_tokens=512, do_sample=True, temperature=0.7)
-        response = internvl_model.chat(tokenizer, pixel_values, prompt, generation_config)
+        pool = get_worker_pool()
+        with trace.stage("generation"):
+            if pool is not None:
+                try:
+                    response = pool.chat(pixel_values, OCR_PROMPT, OCR_GENERATION_CONFIG, cancel_event, trace)
+                except CancelledError:
+                    raise JobCancelled()
+            else:
+                generation_config = dict(OCR_GENERATION_CONFIG)
+                if cancel_event is not None:
+                    generation_config["stopping_criteria"] = StoppingCriteriaList([CancelStoppingCriteria(cancel_event)])
+                with generation_lock, model_manager.acquire() as (internvl_model, tokenizer, device):
+                    response = internvl_model.chat(tokenizer, pixel_values.to(device), OCR_PROMPT, generation_config)
+                tokens = count_generated_tokens(tokenizer, response)
+                if tokens is not None:
+                    trace.count("tokens_generated", tokens)
+        check_cancelled(cancel_event)
+        ocr_cache.put(cache_key, response)
         
         logger.info(f"OCR result: {response[:100]}...")
         return response
 
+    except JobCancelled:
+        logger.info("InternVL generation cancelled")
+        raise
+
     except Exception as e:
         logger.error(f"Error in internvl_ocr: {e}")
         raise
@@ -132,23 +250,111 @@ def internvl_ocr(image_path):
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
 
+def internvl_ocr_batch(image_paths, max_batch_size=MAX_OCR_BATCH_SIZE):
+    """
+    Describes several screenshots, running up to max_batch_size of them through
+    a single batched InternVL generation.
+
+    The tiles of every image in a batch are concatenated into one tensor and
+    num_patches_list tells the model which tiles belong to which image. If a
+    batch fails (e.g. out of memory) its images are retried one at a time.
+    With INFERENCE_WORKERS set, the images are instead spread over the worker
+    processes, one generation each, and any that fail are retried one at a time.
+
+    :param image_paths: Paths to the screenshot images.
+    :param max_batch_size: Maximum number of images per generation call.
+    :return: List of descriptions, in the same order as image_paths.
+    """
+    descriptions = [None] * len(image_paths)
+
+    # Only screenshots missing from the OCR cache go to the model
+    pending = []
+    for index, path in enumerate(image_paths):
+        tiles = load_image(path, max_num=12, dtype=torch.bfloat16, adaptive_max_num=True)
+        cache_key = ocr_cache_key(tiles, OCR_PROMPT, OCR_GENERATION_CONFIG)
+        cached = ocr_cache.get(cache_key)
+        if cached is not None:
+            descriptions[index] = cached
+        else:
+            pending.append((index, tiles, cache_key))
+
+    pool = get_worker_pool()
+    if pool is not None:
+        futures = [pool.submit(tiles, OCR_PROMPT, OCR_GENERATION_CONFIG) for _, tiles, _ in pending]
+        failed = []
+        for (index, _, cache_key), future in zip(pending, futures):
+            try:
+                descriptions[index] = future.result()
+            except Exception as e:
+                logger.warning(f"Worker OCR of {image_paths[index]} failed ({e}), retrying it")
+                failed.append(index)
+                continue
+            ocr_cache.put(cache_key, descriptions[index])
+        # Every success is cached above, so only the failures are generated again
+        for index in failed:
+            descriptions[index] = internvl_ocr(image_paths[index])
+        return descriptions
+
+    batch_size = max(1, max_batch_size)
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        try:
+            num_patches_list = [tiles.size(0) for _, tiles, _ in batch]
+            pixel_values = torch.cat([tiles for _, tiles, _ in batch], dim=0)
+
+            with generation_lock, model_manager.acquire() as (internvl_model, tokenizer, device):
+                if len(batch) == 1:
+                    responses = [internvl_model.chat(tokenizer, pixel_values.to(device), OCR_PROMPT,
+                                                     dict(OCR_GENERATION_CONFIG))]
+                else:
+                    responses = internvl_model.batch_chat(
+                        tokenizer,
+                        pixel_values.to(device),
+                        num_patches_list=num_patches_list,
+                        questions=[OCR_PROMPT] * len(batch),
+                        generation_config=dict(OCR_GENERATION_CONFIG)
+                    )
+            logger.info(f"Batched OCR of {len(batch)} screenshots ({sum(num_patches_list)} tiles)")
+
+        except Exception as e:
+            logger.warning(f"Batched OCR failed ({e}), falling back to single-image path")
+            responses = [internvl_ocr(image_paths[index]) for index, _, _ in batch]
+
+        finally:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+        for (index, _, cache_key), response in zip(batch, responses):
+            ocr_cache.put(cache_key, response)
+            descriptions[index] = response
+
+    return descriptions
+
 # -------------------------------
 # Step 2: Llama Classification Function
 # -------------------------------
-def llama_classification(ocr_result, definition):
+def llm_classify(ocr_result, definition):
+    """Asks Llama for a {'label', 'reasoning'} verdict over a streamed completion."""
+    prompt = CLASSIFICATION_TEMPLATE.format(extracted_text=ocr_result, definition=definition)
+    return ollama_client.generate_fields(prompt, fields=("label", "reasoning"))
+
+# Verdict cache -> keyword rules (classification_rules.json if present) -> Llama
+verdict_classifier = TieredClassifier(llm_classify, RuleEngine.from_file("classification_rules.json"))
+
+def llama_classification(ocr_result, definition, trace=None):
     """
     Uses Llama 3 (via Ollama) to classify the image description.
     
     :param ocr_result: The text output from InternVL.
     :param definition: A string (or JSON string) defining what constitutes procrastination.
+    :param trace: PipelineTrace receiving the classification and save timings.
     :return: A JSON object with classification details.
     """
+    trace = trace or PipelineTrace()
     try:
-        # Get classification from Llama
-        result = classification_chain.invoke({
-            "extracted_text": ocr_result,
-            "definition": definition
-        })
+        # Get classification from the cache, the rules or Llama
+        with trace.stage("classification"):
+            result = verdict_classifier.classify(ocr_result, definition, trace=trace)
         
         # Format the result in the desired structure
         formatted_result = [{
@@ -159,22 +365,13 @@ def llama_classification(ocr_result, definition):
             "Verdict": result.get("label") == "procrastination"
         }]
 
-        # Create analyses directory if it doesn't exist
-        os.makedirs("analyses", exist_ok=True)
-        
-        # Generate filename with timestamp
-        filename = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        filepath = os.path.join("analyses", filename)
-        
-        # Save to JSON file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(formatted_result, f, indent=4)
-            
-        logger.info(f"Analysis saved to {filepath}")
+        with trace.stage("save"):
+            save_analysis(formatted_result)
         return formatted_result
 
     except Exception as e:
         logger.error(f"Error in llama_classification: {e}")
+        trace.count("classification_errors")
         return [{
             "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "Content": "Error processing content",
@@ -182,62 +379,114 @@ def llama_classification(ocr_result, definition):
             "Verdict": False
         }]
 
+def save_analysis(formatted_result):
+    """
+    Appends an analysis result to the analysis store.
+
+    :param formatted_result: The list returned by llama_classification.
+    """
+    analysis_store.append(formatted_result)
+    logger.info(f"Analysis saved ({formatted_result[0]['Timestamp']})")
+
 # -------------------------------
 # Pipeline Runner Function
 # -------------------------------
-def run_pipeline(image_path, definition):
+def run_pipeline(image_path, definition, cancel_event=None, detector=None, trace=None):
     """
     Runs the pipeline by first extracting text from the image and then classifying the result.
+
+    image_path may also be a PIL image straight from capture_frame, which skips
+    the encode/decode round trip through disk. detector is the session's own
+    ScreenChangeDetector; it defaults to the module-level one.
+
+    If cancel_event is given and gets set, InternVL decoding stops at the next token
+    and JobCancelled is raised before any later stage runs.
+
+    Stage timings and counters go to ``trace`` (a new PipelineTrace if not given,
+    e.g. one that already timed the capture) and are added to pipeline_metrics.
     """
     logger.info("=== Starting Pipeline ===")
-    logger.info(f"Image path: {image_path}")
+    logger.info(f"Image: {image_path if isinstance(image_path, str) else 'in-memory capture'}")
     logger.info(f"Definition: {definition}")
 
-    # Step 1: Extract text description from the image
-    ocr_result = internvl_ocr(image_path)
-    logger.debug(f"InternVL Output: {ocr_result}")  # Changed to debug level
-    
-    # Step 2: Classify the extracted text
-    classification_result = llama_classification(ocr_result, definition)
-    logger.info(f"Classification result: {classification_result}")
-
-    # Check if procrastination was detected
-    if classification_result[0]["Verdict"]:
-        logger.info("Procrastination detected - triggering notifications")
-        # Send both system notification and voice notification
-        notification.notify(
-            title='Procrastination Alert!',
-            message='You have been caught procrastinating. Time to get back to work!',
-            app_icon=None,
-            timeout=10,
-        )
-        speak("You have been caught procrastinating, please look at the schedule your AI assistant to make you an academic weapon.")
-
-    else:
-        logger.info("No procrastination detected - no notifications")
-
-    logger.info("=== Pipeline Complete ===")
-    return classification_result
+    trace = trace or PipelineTrace()
+    outcome = "failed"
+    try:
+        # Step 0: Reuse the previous verdict if the screen hasn't meaningfully changed
+        detector = detector or change_detector
+        with trace.stage("change_detection"):
+            if isinstance(image_path, Image.Image):
+                frame_hash, previous_result = detector.check(image_path, definition)
+            else:
+                with Image.open(image_path) as image:
+                    frame_hash, previous_result = detector.check(image, definition)
+
+        if previous_result is not None:
+            logger.info(f"Screen unchanged - reusing previous verdict ({detector.stats()['skipped']} runs skipped)")
+            trace.count("screen_unchanged")
+            classification_result = [{**previous_result[0], "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}]
+            with trace.stage("save"):
+                save_analysis(classification_result)
+        else:
+            # Step 1: Extract text description from the image
+            ocr_result = internvl_ocr(image_path, cancel_event, trace)
+            logger.debug(f"InternVL Output: {ocr_result}")  # Changed to debug level
+            check_cancelled(cancel_event)
+
+            # Step 2: Classify the extracted text
+            classification_result = llama_classification(ocr_result, definition, trace)
+            logger.info(f"Classification result: {classification_result}")
+
+            # Errors are not worth reusing; only remember real verdicts
+            if not classification_result[0]["Justification"].startswith("Error:"):
+                detector.update(frame_hash, definition, classification_result)
+
+        # Check if procrastination was detected
+        if classification_result[0]["Verdict"]:
+            logger.info("Procrastination detected - triggering notifications")
+            trace.count("notifications")
+            # Send both system notification and voice notification
+            with trace.stage("notification"):
+                notification.notify(
+                    title='Procrastination Alert!',
+                    message='You have been caught procrastinating. Time to get back to work!',
+                    app_icon=None,
+                    timeout=10,
+                )
+                speak("You have been caught procrastinating, please look at the schedule your AI assistant to make you an academic weapon.")
+
+        else:
+            logger.info("No procrastination detected - no notifications")
+
+        logger.info("=== Pipeline Complete ===")
+        outcome = "completed"
+        return classification_result
+
+    except JobCancelled:
+        outcome = "cancelled"
+        raise
+
+    finally:
+        pipeline_metrics.record(trace, outcome)
+        logger.info(f"Pipeline {outcome}: " + ", ".join(f"{name} {seconds * 1000:.0f} ms"
+                                                        for name, seconds in trace.stages))
 
 # -------------------------------
 # Get Latest Screenshot Function
 # -------------------------------
 def get_latest_screenshot():
     """
-    Captures a new screenshot and gets its path.
+    Captures a new screenshot and keeps it in memory.
+    Saving a copy to disk (if enabled) happens on a background thread.
     Returns:
-        str: Path to the captured screenshot, or None if failed
+        PIL.Image.Image: The captured screenshot, or None if failed
     """
     try:
         # Capture new screenshot
-        screenshot_path = capture_screenshot()
-        logger.info(f"New screenshot captured: {screenshot_path}")
-        
-        if not os.path.exists(screenshot_path):
-            logger.error(f"Screenshot was not created: {screenshot_path}")
-            return None
-            
-        return screenshot_path
+        screenshot, saved_path = capture_frame()
+        logger.info(f"New screenshot captured ({screenshot.width}x{screenshot.height}, {CAPTURE_MODE} mode)"
+                    + (f", saving to {saved_path}" if saved_path else ""))
+        return screenshot
         
     except Exception as e:
         logger.error(f"Error capturing/getting screenshot: {e}")
@@ -253,24 +502,48 @@ if __name__ == '__main__':
     # Create the full definition
     definition = create_definition(study_topic)
     
+    sampler = AdaptiveSampler(min_interval=SAMPLE_MIN_INTERVAL, max_interval=SAMPLE_MAX_INTERVAL,
+                              inference_budget=INFERENCE_BUDGET)
+
+    def analyze_once(screenshot, trace):
+        """Runs one analysis and reports the outcome to the sampler."""
+        changed, verdict = True, None
+        try:
+            final_output = run_pipeline(screenshot, definition, trace=trace)
+            print("Final Output:", final_output)
+            changed = "screen_unchanged" not in trace.counters
+            if not final_output[0]["Justification"].startswith("Error:"):
+                verdict = final_output[0]["Verdict"]
+        except Exception as e:
+            logger.error(f"Error in analysis: {e}")
+        finally:
+            # Only model time counts against the budget, not capture, saving or notifications;
+            # OCR cache hits and rule/cache verdicts add little or nothing
+            model_seconds = trace.stage_seconds("generation") + trace.stage_seconds("classification")
+            sampler.finish(changed, verdict, model_seconds)
+
     try:
         while True:
-            # Get new screenshot and analyze it
-            image_path = get_latest_screenshot()
-            if image_path:
-                # Run the pipeline synchronously
-                final_output = run_pipeline(image_path, definition)
-                print("Final Output:", final_output)
-            
-            # Wait for 10 minutes before next capture
-            logger.info("Waiting 1 minute before next screenshot...")
-            time.sleep(60)  # 60 seconds = 1 minute
+            # A tick is skipped while the previous analysis is still running
+            # or the hourly inference budget is used up
+            if sampler.try_start():
+                trace = PipelineTrace()
+                with trace.stage("capture"):
+                    screenshot = get_latest_screenshot()
+                if screenshot is None:
+                    sampler.finish(changed=False, verdict=None)
+                else:
+                    threading.Thread(target=analyze_once, args=(screenshot, trace), daemon=True).start()
+
+            logger.info(f"Waiting {sampler.next_due() - time.monotonic():.0f}s before next screenshot... "
+                        f"({sampler.stats()})")
+            sampler.wait()
             
     except KeyboardInterrupt:
         logger.info("Screenshot analysis stopped by user")
         # Cleanup resources
-        cleanup_model(internvl_model)
+        model_manager.unload()
     except Exception as e:
         logger.error(f"Error in main loop: {e}")
         # Cleanup resources
-        cleanup_model(internvl_model)
+        model_manager.unload()
@@ -0,0 +1,59 @@
+"""
+Compare images/sec of the one-at-a-time internvl_ocr loop against internvl_ocr_batch.
+
+Run from the backend directory (loads the real InternVL model):
+    python benchmarks/bench_batch_ocr.py --device cpu --repeat 2 --batch-size 4
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+SCREENSHOT_DIR = Path(__file__).resolve().parent.parent / "backend" / "screenshots"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--device", default="cpu", help="Set to 'cpu' to hide CUDA devices")
+    parser.add_argument("--repeat", type=int, default=2, help="Times the screenshot set is repeated")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    if args.device == "cpu":
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    import analyze_screenshots
+
+    # Shorter generations keep a CPU run tractable; both paths use the same config
+    analyze_screenshots.OCR_GENERATION_CONFIG["max_new_tokens"] = args.max_new_tokens
+    analyze_screenshots.OCR_GENERATION_CONFIG["do_sample"] = False
+
+    paths = sorted(glob.glob(str(SCREENSHOT_DIR / "*.png"))) * args.repeat
+    if not paths:
+        sys.exit(f"No screenshots found in {SCREENSHOT_DIR}")
+
+    # Warm-up so neither path pays for lazy kernels/allocations
+    analyze_screenshots.internvl_ocr(paths[0])
+
+    start = time.perf_counter()
+    for path in paths:
+        analyze_screenshots.internvl_ocr(path)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analyze_screenshots.internvl_ocr_batch(paths, max_batch_size=args.batch_size)
+    batch_seconds = time.perf_counter() - start
+
+    print(f"images:          {len(paths)}")
+    print(f"loop:            {len(paths) / loop_seconds:.3f} images/sec ({loop_seconds:.1f}s)")
+    print(f"batch (size {args.batch_size}):  {len(paths) / batch_seconds:.3f} images/sec ({batch_seconds:.1f}s)")
+    print(f"speedup:         {loop_seconds / batch_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
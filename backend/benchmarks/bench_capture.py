@@ -0,0 +1,101 @@
+"""
+Capture-to-tensor latency: PNG write-then-read versus the in-memory handoff.
+
+By default a stored screenshot stands in for the screen grab so the benchmark
+runs headless; pass --grab to use ImageGrab on a real display.
+    python benchmarks/bench_capture.py --repeat 10 --format jpeg --quality 85
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import torch
+from PIL import Image
+
+from screenshot_taker import ScreenshotWriter
+from utils.internvl_loader import load_image
+
+SCREENSHOT_DIR = Path(__file__).resolve().parent.parent / "backend" / "screenshots"
+
+
+def make_grab(use_screen):
+    if use_screen:
+        from screenshot_taker import grab_screen
+        return grab_screen
+    paths = sorted(glob.glob(str(SCREENSHOT_DIR / "*.png")))
+    if not paths:
+        sys.exit(f"No screenshots found in {SCREENSHOT_DIR}; use --grab on a machine with a display")
+    with Image.open(paths[-1]) as image:
+        frame = image.convert("RGB")
+    return frame.copy
+
+
+def median_ms(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--format", default="jpeg", choices=["webp", "jpeg", "png"])
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--grab", action="store_true", help="Capture the real screen")
+    args = parser.parse_args()
+
+    grab = make_grab(args.grab)
+    frame = grab()
+    print(f"frame {frame.width}x{frame.height}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def png_round_trip():
+            # Old path: grab, save a default-compression PNG, reopen and decode it
+            path = os.path.join(tmp, "frame.png")
+            grab().save(path)
+            return load_image(path, max_num=12, dtype=torch.bfloat16)
+
+        writer = ScreenshotWriter(directory=tmp, image_format=args.format, quality=args.quality)
+
+        def in_memory():
+            # New path: tensor straight from the grabbed image, copy saved in the background
+            image = grab()
+            writer.submit(image, timestamp=str(time.perf_counter_ns()))
+            return load_image(image, max_num=12, dtype=torch.bfloat16)
+
+        def in_memory_no_persist():
+            return load_image(grab(), max_num=12, dtype=torch.bfloat16)
+
+        assert torch.equal(png_round_trip(), in_memory_no_persist())
+
+        old_ms = median_ms(png_round_trip, args.repeat)
+        new_ms = median_ms(in_memory, args.repeat)
+        writer.flush()
+        bare_ms = median_ms(in_memory_no_persist, args.repeat)
+        print(f"PNG write-then-read:        {old_ms:8.1f} ms")
+        print(f"in-memory + async {args.format:<5}:   {new_ms:8.1f} ms  ({writer.saved} saved, {writer.dropped} dropped)")
+        print(f"in-memory, no persistence:  {bare_ms:8.1f} ms")
+
+        sizes = {}
+        for image_format in ("png", "webp", "jpeg"):
+            encoder = ScreenshotWriter(directory=tmp, image_format=image_format, quality=args.quality)
+            path = os.path.join(tmp, f"size.{image_format}")
+            start = time.perf_counter()
+            encoder.write(frame, path)
+            sizes[image_format] = (os.path.getsize(path) / 1024, (time.perf_counter() - start) * 1000)
+        print("background encode: " + ", ".join(f"{fmt} {kb:.0f} KB in {ms:.0f} ms" for fmt, (kb, ms) in sizes.items()))
+
+
+if __name__ == "__main__":
+    main()
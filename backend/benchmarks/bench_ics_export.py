@@ -0,0 +1,95 @@
+"""
+Compare the old in-memory icalendar export with the streaming ICSWriter, and
+measure an incremental re-export after a small fraction of slots changed.
+
+    python benchmarks/bench_ics_export.py --days 240 --slots-per-day 48 --change 0.01
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.ics_writer import ICSWriter, read_events
+
+
+def legacy_export(merged_schedule, filename):
+    """The original export: a full icalendar.Calendar built in memory, no UIDs."""
+    import pytz
+    from icalendar import Calendar, Event
+
+    cal = Calendar()
+    timezone = pytz.timezone("America/Toronto")
+    for entry in merged_schedule:
+        event = Event()
+        event.add('summary', entry['task'])
+        event_date = datetime.datetime.strptime(f"{entry['date']} {entry['time']}", "%Y-%m-%d %I:%M %p")
+        event.add('dtstart', timezone.localize(event_date))
+        event.add('dtend', timezone.localize(event_date + datetime.timedelta(minutes=30)))
+        cal.add_component(event)
+    with open(filename, 'wb') as f:
+        f.write(cal.to_ical())
+
+
+def synthetic_schedule(days, slots_per_day, seed=0):
+    rng = random.Random(seed)
+    start = datetime.date(2025, 1, 6)
+    return [
+        {
+            'date': (start + datetime.timedelta(days=day)).isoformat(),
+            'time': (datetime.datetime(2025, 1, 1, 8) + datetime.timedelta(minutes=15 * slot)).strftime("%I:%M %p"),
+            'task': rng.choice(["Self Study", "Course 3 lab report", "Course 7 problem set, part 2"]),
+        }
+        for day in range(days) for slot in range(slots_per_day)
+    ]
+
+
+def as_events(merged_schedule):
+    return ((entry['date'], entry['time'], entry['task']) for entry in merged_schedule)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=240)
+    parser.add_argument("--slots-per-day", type=int, default=48)
+    parser.add_argument("--change", type=float, default=0.01, help="Fraction of slots changed before re-export")
+    args = parser.parse_args()
+
+    merged = synthetic_schedule(args.days, args.slots_per_day)
+    writer = ICSWriter()
+    print(f"{len(merged)} events")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path, path = os.path.join(tmp, "legacy.ics"), os.path.join(tmp, "schedule.ics")
+        try:
+            legacy_s, _ = timed(lambda: legacy_export(merged, legacy_path))
+            print(f"icalendar full export:  {legacy_s * 1000:9.1f} ms  {os.path.getsize(legacy_path) / 1e6:.1f} MB")
+        except ImportError:
+            print("icalendar full export:  icalendar not installed, skipped")
+
+        full_s, counts = timed(lambda: writer.write(as_events(merged), path))
+        print(f"streaming full export:  {full_s * 1000:9.1f} ms  {os.path.getsize(path) / 1e6:.1f} MB  {counts}")
+
+        rng = random.Random(1)
+        for entry in rng.sample(merged, int(len(merged) * args.change)):
+            entry['task'] += " (rescheduled)"
+        incremental_s, counts = timed(lambda: writer.write(as_events(merged), path, incremental=True))
+        print(f"incremental re-export:  {incremental_s * 1000:9.1f} ms  {counts}")
+
+        bumped = sum(1 for _, sequence, _ in read_events(path).values() if sequence > 0)
+        print(f"events with SEQUENCE > 0 after re-export: {bumped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare the per-tile PIL/torchvision preprocessing with the vectorized preprocess_image.
+
+Run from the backend directory:
+    python benchmarks/bench_preprocess.py --repeat 20
+"""
+import argparse
+import glob
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import torch
+from PIL import Image
+
+from utils.internvl_loader import build_transform, dynamic_preprocess, preprocess_image
+
+SCREENSHOT_DIR = Path(__file__).resolve().parent.parent / "backend" / "screenshots"
+
+
+def legacy_preprocess(image, input_size=448, max_num=12):
+    """The original load_image body: fresh Compose, PIL crop + ToTensor + Normalize per tile."""
+    transform = build_transform.__wrapped__(input_size=input_size)
+    images = dynamic_preprocess(image, image_size=input_size, use_thumbnail=True, max_num=max_num)
+    return torch.stack([transform(tile) for tile in images]).to(torch.bfloat16)
+
+
+def time_it(fn, image, repeat):
+    fn(image)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(image)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-num", type=int, default=12)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(str(SCREENSHOT_DIR / "*.png")))
+    if not paths:
+        sys.exit(f"No screenshots found in {SCREENSHOT_DIR}")
+
+    for path in paths:
+        with Image.open(path) as image:
+            image = image.convert("RGB")
+
+        legacy = legacy_preprocess(image, max_num=args.max_num)
+        fast = preprocess_image(image, max_num=args.max_num, dtype=torch.bfloat16)
+        if not torch.equal(legacy, fast):
+            sys.exit(f"Output mismatch for {path}")
+
+        legacy_s = time_it(lambda img: legacy_preprocess(img, max_num=args.max_num), image, args.repeat)
+        fast_s = time_it(lambda img: preprocess_image(img, max_num=args.max_num, dtype=torch.bfloat16),
+                         image, args.repeat)
+        print(f"{Path(path).name} {image.size[0]}x{image.size[1]} -> {fast.size(0)} tiles: "
+              f"legacy {legacy_s * 1000:.1f} ms, vectorized {fast_s * 1000:.1f} ms "
+              f"({legacy_s / fast_s:.2f}x), bit-identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Tiles per frame and capture-to-tensor latency for full-screen, focused-window
+and fixed-region capture.
+
+A stored screenshot stands in for the screen and StaticGeometryProvider for the
+focused window, so this runs headless. --with-model also times InternVL
+generation on each mode's tiles (downloads/loads the model).
+    python benchmarks/bench_roi_capture.py --window 1400x900 1024x700 --region 0,0,1280,800
+"""
+import argparse
+import glob
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import torch
+from PIL import Image
+
+from screenshot_taker import crop_to_geometry
+from utils.internvl_loader import load_image
+from utils.window_geometry import StaticGeometryProvider, parse_region
+
+SCREENSHOT_DIR = Path(__file__).resolve().parent.parent / "backend" / "screenshots"
+OCR_PROMPT = "<image>\nPlease describe this screenshot in detail, focusing on any visible text content."
+
+
+def centered_window(screen_size, window_size):
+    (screen_w, screen_h), (w, h) = screen_size, window_size
+    left, top = (screen_w - w) // 2, (screen_h - h) // 2
+    return left, top, left + w, top + h
+
+
+def median_ms(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--window", nargs="+", default=["1400x900", "1024x700", "800x600"],
+                        help="Stand-in focused window sizes, centered")
+    parser.add_argument("--region", default="0,0,1280,800", help="Configured capture region")
+    parser.add_argument("--with-model", action="store_true")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(str(SCREENSHOT_DIR / "*.png")))
+    if not paths:
+        sys.exit(f"No screenshots found in {SCREENSHOT_DIR}")
+
+    model = None
+    if args.with_model:
+        from utils.internvl_loader import load_internvl_model
+        model, tokenizer, _, device = load_internvl_model()
+
+    window_sizes = [tuple(int(part) for part in size.split("x")) for size in args.window]
+    for path in paths[-3:]:
+        with Image.open(path) as image:
+            screen = image.convert("RGB")
+        modes = {"full": None}
+        for w, h in window_sizes:
+            modes[f"window {w}x{h}"] = StaticGeometryProvider(centered_window(screen.size, (w, h)))
+        modes[f"region {args.region}"] = StaticGeometryProvider(parse_region(args.region))
+        print(f"{Path(path).name} ({screen.width}x{screen.height})")
+        for mode, geometry in modes.items():
+            def capture_to_tensor():
+                frame = crop_to_geometry(screen, geometry)
+                if mode == "full":
+                    # Previous behaviour: a fixed budget of 12 tiles
+                    return load_image(frame, max_num=12, dtype=torch.bfloat16)
+                return load_image(frame, max_num=12, dtype=torch.bfloat16, adaptive_max_num=True)
+
+            tiles = capture_to_tensor()
+            line = f"  {mode:<24} {tiles.size(0):>3} tiles  capture-to-tensor {median_ms(capture_to_tensor, args.repeat):7.1f} ms"
+            if model is not None:
+                config = dict(max_new_tokens=256, do_sample=False)
+                start = time.perf_counter()
+                model.chat(tokenizer, tiles.to(device), OCR_PROMPT, config)
+                line += f"  generation {(time.perf_counter() - start) * 1000:8.1f} ms"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
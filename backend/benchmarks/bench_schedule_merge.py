@@ -0,0 +1,94 @@
+"""
+Time merge_schedule_with_assignments at full-semester, multi-course scale
+against the original scan-and-remove merge.
+
+    python benchmarks/bench_schedule_merge.py --assignments 5000 --days 120 --slots-per-day 200
+"""
+import argparse
+import copy
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from Canvas_schedule_integration import merge_schedule_with_assignments
+
+
+def legacy_merge(study_schedule, assignments):
+    """The original merge: scans every assignment per slot and removes the match."""
+    merged_schedule = []
+    for date, time_slots in study_schedule['schedule'].items():
+        for time_slot, is_study_time in time_slots.items():
+            if is_study_time:
+                assigned_task = None
+                for assignment in assignments:
+                    if date == assignment['due_at'][:10]:
+                        assigned_task = assignment['name']
+                        assignments.remove(assignment)
+                        break
+                merged_schedule.append({'date': date, 'time': time_slot,
+                                        'task': assigned_task if assigned_task else 'Self Study'})
+    return merged_schedule
+
+
+def synthetic_semester(num_assignments, days, slots_per_day, seed=0):
+    rng = random.Random(seed)
+    start = datetime.date(2025, 1, 6)
+    schedule = {}
+    for day in range(days):
+        date = (start + datetime.timedelta(days=day)).isoformat()
+        # 5-minute slots from 8:00 am onwards, roughly half of them study time
+        schedule[date] = {
+            (datetime.datetime(2025, 1, 1, 8) + datetime.timedelta(minutes=5 * i)).strftime("%I:%M %p"):
+                rng.random() < 0.5
+            for i in range(slots_per_day)
+        }
+    assignments = []
+    for i in range(num_assignments):
+        due = datetime.datetime.combine(start, datetime.time(23, 59)) + datetime.timedelta(
+            days=rng.randrange(days), minutes=-rng.randrange(0, 16 * 60, 30))
+        assignments.append({
+            'id': i,
+            'name': f"Course {i % 12} assignment {i}",
+            'due_at': due.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'points_possible': rng.choice([5, 10, 20, 50, 100]),
+        })
+    return {'schedule': schedule}, assignments
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--assignments", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--slots-per-day", type=int, default=200)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    schedule, assignments = synthetic_semester(args.assignments, args.days, args.slots_per_day)
+    slots = sum(len(slots) for slots in schedule['schedule'].values())
+    print(f"{len(assignments)} assignments, {slots} slots over {args.days} days")
+
+    before = copy.deepcopy((schedule, assignments))
+    indexed_s, merged = timed(merge_schedule_with_assignments, schedule, assignments)
+    assert (schedule, assignments) == before, "inputs were modified"
+    placed = sum(entry['task'] != 'Self Study' for entry in merged)
+    print(f"indexed merge: {indexed_s * 1000:9.1f} ms  ({placed} slots got an assignment, inputs unchanged)")
+
+    if not args.skip_legacy:
+        legacy_s, legacy = timed(legacy_merge, *copy.deepcopy(before))
+        legacy_placed = sum(entry['task'] != 'Self Study' for entry in legacy)
+        print(f"legacy merge:  {legacy_s * 1000:9.1f} ms  ({legacy_placed} slots got an assignment)")
+        print(f"speedup:       {legacy_s / indexed_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compare the schedule-explanation prompt built from every analysis (the old
+"one JSON line per analysis" prompt) with the compacted, budget-bounded one.
+
+Runs against the local fake Ollama, whose prompt evaluation costs a fixed
+delay per prompt token:
+    python benchmarks/bench_schedule_prompt.py --sizes 10 1000 10000 100000
+"""
+import argparse
+import datetime
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_ollama import start_fake_ollama
+from implement_study_plan import (DEFAULT_PROMPT_TOKEN_BUDGET, compact_history, estimate_tokens,
+                                  pick_justifications, productivity_profile, select_study_hours)
+
+EXPLANATION = "Your focus peaks in the morning, so the schedule front-loads study time."
+
+
+def synthetic_analyses(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime.datetime(2025, 1, 6, 8)
+    analyses = []
+    for i in range(count):
+        timestamp = start + datetime.timedelta(minutes=5 * i)
+        verdict = rng.random() < (0.3 if timestamp.hour < 13 else 0.6)
+        analyses.append({
+            "Timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            "Content": "The screen shows a browser with lecture slides and a notes editor. " * 3,
+            "Justification": ("The user is watching short videos." if verdict
+                              else "The user is reading course material.") + f" (sample {i})",
+            "Verdict": verdict,
+        })
+    return analyses
+
+
+def full_prompt(analyses):
+    """The prompt the scheduler used to send: every analysis, verbatim."""
+    analysis_data = "\n".join(json.dumps(analysis) for analysis in analyses)
+    return f"Given the following analyses, generate a study schedule.\n{analysis_data}"
+
+
+def compact_prompt(analyses, token_budget):
+    samples, productive = productivity_profile([a["Timestamp"] for a in analyses],
+                                               [a["Verdict"] for a in analyses])
+    chosen, _ = select_study_hours(samples, productive, 5, range(8, 23))
+    return compact_history(samples, productive, chosen, pick_justifications(analyses), token_budget)
+
+
+def time_request(session, url, prompt):
+    start = time.perf_counter()
+    response = session.post(f"{url}/api/generate", json={"model": "mistral", "prompt": prompt, "stream": False})
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_PROMPT_TOKEN_BUDGET)
+    parser.add_argument("--full-max", type=int, default=10000,
+                        help="Only send the full prompt up to this many analyses (it grows without bound)")
+    parser.add_argument("--prompt-token-delay", type=float, default=0.00002,
+                        help="Seconds of prompt evaluation per prompt token")
+    args = parser.parse_args()
+
+    import requests
+    server = start_fake_ollama(token_delay=0.0, completion=EXPLANATION,
+                               prompt_token_delay=args.prompt_token_delay)
+    session = requests.Session()
+
+    print(f"{'analyses':>9} | {'full tokens':>11} {'full ms':>9} | {'compact tokens':>14} {'build ms':>8} {'total ms':>8}")
+    for size in args.sizes:
+        analyses = synthetic_analyses(size)
+
+        prompt = full_prompt(analyses)
+        full_tokens = estimate_tokens(prompt)
+        full_ms = "-"
+        if size <= args.full_max:
+            full_ms = f"{time_request(session, server.url, prompt) * 1000:.1f}"
+
+        start = time.perf_counter()
+        prompt = compact_prompt(analyses, args.token_budget)
+        build_s = time.perf_counter() - start
+        compact_tokens = estimate_tokens(prompt)
+        compact_s = build_s + time_request(session, server.url, prompt)
+
+        print(f"{size:>9} | {full_tokens:>11} {full_ms:>9} | "
+              f"{compact_tokens:>14} {build_s * 1000:>8.1f} {compact_s * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
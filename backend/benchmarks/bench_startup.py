@@ -0,0 +1,103 @@
+"""
+Measure API startup: import time of main.py and time-to-first-response of its routes.
+
+Run from the backend directory:
+    python benchmarks/bench_startup.py --runs 3
+    python benchmarks/bench_startup.py --with-canvas   # also time /api/courses (needs Canvas access)
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - start)"
+)
+
+# Imported by the analysis routes only; timed for comparison with main.py's own import
+ML_STACK = "torch, torchvision, transformers, langchain_core"
+
+
+def time_import(module):
+    """Import ``module`` in a fresh interpreter and return the seconds it took."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_first_response(paths, timeout=120):
+    """
+    Start uvicorn on main:app and return {path: seconds from process start to first 200}.
+    """
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    timings = {}
+    try:
+        for path in paths:
+            while time.perf_counter() - start < timeout:
+                try:
+                    if requests.get(f"http://127.0.0.1:{port}{path}", timeout=30).status_code == 200:
+                        timings[path] = time.perf_counter() - start
+                        break
+                except requests.exceptions.ConnectionError:
+                    time.sleep(0.02)
+            else:
+                timings[path] = None
+    finally:
+        server.terminate()
+        server.wait()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--with-canvas", action="store_true", help="Also time /api/courses")
+    args = parser.parse_args()
+
+    paths = ["/", "/api/cache-stats", "/api/pipeline-stats"]
+    if args.with_canvas:
+        paths.append("/api/courses")
+
+    import_times = [time_import("main") for _ in range(args.runs)]
+    print(f"import main:       {statistics.median(import_times):.3f}s (median of {args.runs})")
+
+    try:
+        ml_times = [time_import(ML_STACK) for _ in range(args.runs)]
+        print(f"import ML stack:   {statistics.median(ml_times):.3f}s (no longer paid at startup)")
+    except subprocess.CalledProcessError:
+        print("import ML stack:   not installed, skipped")
+
+    runs = [time_first_response(paths) for _ in range(args.runs)]
+    for path in paths:
+        values = [run[path] for run in runs if run[path] is not None]
+        if values:
+            print(f"first {path:<20} {statistics.median(values):.3f}s after process start")
+        else:
+            print(f"first {path:<20} no 200 response")
+
+
+if __name__ == "__main__":
+    os.chdir(BACKEND_DIR)
+    main()
@@ -0,0 +1,86 @@
+"""
+Local stand-in for a paginated Canvas collection endpoint.
+
+Serves any GET path as a collection of ``total`` items ({"id": n, "name": ...}),
+honouring ``per_page`` (capped at 100 like Canvas) and linking the pages via a
+``Link`` header. With bookmarks=False pages are numbered and rel="last" is
+advertised, so clients can fetch them concurrently; with bookmarks=True the
+``page`` values are opaque "bookmark:..." tokens and there is no rel="last".
+"""
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+MAX_PER_PAGE = 100
+
+
+def encode_bookmark(offset):
+    return "bookmark:" + base64.urlsafe_b64encode(json.dumps([offset]).encode()).decode()
+
+
+def decode_bookmark(value):
+    return json.loads(base64.urlsafe_b64decode(value[len("bookmark:"):]))[0]
+
+
+class FakeCanvasHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    total = 250
+    default_per_page = 10
+    bookmarks = False
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        with self.server.lock:
+            self.server.requests.append((parsed.path, query))
+        per_page = min(int(query.get("per_page", self.default_per_page)), MAX_PER_PAGE)
+        page = query.get("page", "1")
+        if page.startswith("bookmark:"):
+            offset = decode_bookmark(page)
+        else:
+            offset = (int(page) - 1) * per_page
+        items = [{"id": n, "name": f"Item {n}"} for n in range(offset, min(offset + per_page, self.total))]
+
+        def link(page_value):
+            params = {**query, "page": page_value, "per_page": per_page}
+            return f"http://127.0.0.1:{self.server.server_port}{parsed.path}?{urlencode(params)}"
+
+        links = []
+        if self.bookmarks:
+            links.append(f'<{link(encode_bookmark(offset))}>; rel="current"')
+            if offset + per_page < self.total:
+                links.append(f'<{link(encode_bookmark(offset + per_page))}>; rel="next"')
+        else:
+            number = offset // per_page + 1
+            last = max(1, -(-self.total // per_page))
+            links.append(f'<{link(number)}>; rel="current"')
+            if number < last:
+                links.append(f'<{link(number + 1)}>; rel="next"')
+            links.append(f'<{link(1)}>; rel="first"')
+            links.append(f'<{link(last)}>; rel="last"')
+
+        body = json.dumps(items).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Link", ",".join(links))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_fake_canvas(total=250, bookmarks=False, default_per_page=10):
+    """Start the fake server on a free port in a daemon thread and return it."""
+    handler = type("Handler", (FakeCanvasHandler,),
+                   {"total": total, "bookmarks": bookmarks, "default_per_page": default_per_page})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.url = f"http://127.0.0.1:{server.server_port}/api/v1"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,107 @@
+"""
+Local stand-in for the Ollama HTTP API used by the classification benchmarks.
+
+Serves /api/generate, streaming (NDJSON) or not, with a fixed per-token delay
+and an optional per-prompt-token delay standing in for prompt evaluation.
+With error_status set, every request fails with that HTTP status instead.
+The completion puts the JSON verdict first and then keeps talking, like a
+chatty model that ignores "return only JSON".
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VERDICT = '{"label": "productive", "reasoning": "The screenshot shows course notes related to the study topic."}'
+RAMBLE = " Additionally, the user appears focused and no distracting applications are visible on screen." * 4
+
+
+def tokenize(text):
+    """Split text into roughly word-sized tokens, keeping whitespace attached."""
+    tokens, current = [], ""
+    for char in text:
+        current += char
+        if char in ' ,.:"{}':
+            tokens.append(current)
+            current = ""
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    token_delay = 0.01
+    prompt_token_delay = 0.0
+    error_status = None
+    completion = VERDICT + RAMBLE
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        tokens = tokenize(self.completion)
+        limit = payload.get("options", {}).get("num_predict")
+        if limit:
+            tokens = tokens[:limit]
+        self.server.requests += 1
+        if self.error_status:
+            body = json.dumps({"error": "model failed to load"}).encode()
+            self.send_response(self.error_status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        prompt_tokens = len(tokenize(payload.get("prompt", "")))
+        self.server.prompt_tokens.append(prompt_tokens)
+        time.sleep(self.prompt_token_delay * prompt_tokens)
+
+        if payload.get("stream", True):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for token in tokens:
+                    time.sleep(self.token_delay)
+                    self._chunk({"model": payload.get("model"), "response": token, "done": False})
+                self._chunk({"model": payload.get("model"), "response": "", "done": True})
+                self.wfile.write(b"0\r\n\r\n")
+                self.server.completed += 1
+            except (BrokenPipeError, ConnectionResetError):
+                # Client hung up early; a real Ollama stops generating here
+                self.server.aborted += 1
+                self.close_connection = True
+        else:
+            time.sleep(self.token_delay * len(tokens))
+            body = json.dumps({"model": payload.get("model"), "response": "".join(tokens), "done": True}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            self.server.completed += 1
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_fake_ollama(token_delay=0.01, completion=None, prompt_token_delay=0.0, error_status=None):
+    """Start the fake server on a free port in a daemon thread and return it."""
+    handler = type("Handler", (FakeOllamaHandler,),
+                   {"token_delay": token_delay, "prompt_token_delay": prompt_token_delay,
+                    "error_status": error_status})
+    if completion is not None:
+        handler.completion = completion
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.requests = server.completed = server.aborted = 0
+    server.prompt_tokens = []
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
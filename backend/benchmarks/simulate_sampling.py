@@ -0,0 +1,155 @@
+"""
+Replay recorded sessions through the fixed 60 s loop and the AdaptiveSampler
+and report how many model invocations the adaptive schedule saves.
+
+A session is a time-ordered list of analyses; the screen is assumed to show
+the same thing (same Content) until the next recorded analysis. Sessions come
+from the analysis store, or are generated when there are none:
+    python benchmarks/simulate_sampling.py --db analyses.db
+    python benchmarks/simulate_sampling.py --synthetic 5 --hours 6
+"""
+import argparse
+import bisect
+import datetime
+import random
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.sampling_scheduler import AdaptiveSampler
+
+SESSION_GAP = 30 * 60  # A pause this long between analyses starts a new session
+
+
+class Session:
+    def __init__(self, name, times, contents, verdicts, end):
+        self.name, self.times, self.contents, self.verdicts, self.end = name, times, contents, verdicts, end
+
+    def state(self, t):
+        """Index of the screen state shown at time t."""
+        return max(0, bisect.bisect_right(self.times, t) - 1)
+
+
+def sessions_from_store(db_path):
+    from analysis_store import AnalysisStore
+    analyses = AnalysisStore(db_path).range()
+    sessions, current = [], []
+    for analysis in analyses:
+        ts = datetime.datetime.strptime(analysis["Timestamp"], "%Y-%m-%d %H:%M:%S").timestamp()
+        if current and ts - current[-1][0] > SESSION_GAP:
+            sessions.append(current)
+            current = []
+        current.append((ts, analysis["Content"], analysis["Verdict"]))
+    if current:
+        sessions.append(current)
+    result = []
+    for records in sessions:
+        if len(records) < 2:
+            continue
+        start = records[0][0]
+        times = [ts - start for ts, _, _ in records]
+        result.append(Session(f"recorded {datetime.datetime.fromtimestamp(start):%Y-%m-%d %H:%M}", times,
+                              [content for _, content, _ in records], [verdict for _, _, verdict in records],
+                              times[-1] + 60))
+    return result
+
+
+def synthetic_session(seed, hours):
+    """Bursts of quick switching between long stretches on one screen."""
+    rng = random.Random(seed)
+    times, contents, verdicts, t = [], [], [], 0.0
+    while t < hours * 3600:
+        times.append(t)
+        contents.append(f"screen {len(times)}")
+        verdicts.append(rng.random() < 0.3)
+        t += rng.expovariate(1 / 90) if rng.random() < 0.5 else rng.expovariate(1 / 1500)
+    return Session(f"synthetic #{seed}", times, contents, verdicts, hours * 3600)
+
+
+def observe(session, sample_times):
+    """Model invocations and change-detection latency for a list of sample times."""
+    invocations, last, seen_at = 0, None, {}
+    for t in sample_times:
+        index = session.state(t)
+        if session.contents[index] != last:
+            invocations += 1
+            last = session.contents[index]
+        seen_at.setdefault(index, t)
+    latencies = [seen_at[i] - session.times[i] for i in range(len(session.times)) if i in seen_at]
+    missed = len(session.times) - len(seen_at)
+    return invocations, latencies, missed
+
+
+def simulate_fixed(session, interval):
+    return [i * interval for i in range(int(session.end // interval) + 1)]
+
+
+def simulate_adaptive(session, inference_seconds, **sampler_options):
+    clock = [0.0]
+    sampler = AdaptiveSampler(clock=lambda: clock[0], **sampler_options)
+    sample_times, last = [], None
+    while clock[0] <= session.end:
+        if sampler.try_start():
+            sample_times.append(clock[0])
+            index = session.state(clock[0])
+            changed = session.contents[index] != last
+            last = session.contents[index]
+            clock[0] += inference_seconds if changed else 0.5
+            sampler.finish(changed, session.verdicts[index], inference_seconds if changed else 0.0)
+        clock[0] = max(clock[0], sampler.next_due())
+    return sample_times, sampler
+
+
+def describe(latencies):
+    if not latencies:
+        return "-"
+    return f"{statistics.mean(latencies):6.0f}s mean"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default="analyses.db")
+    parser.add_argument("--synthetic", type=int, default=0, help="Also simulate N generated sessions")
+    parser.add_argument("--hours", type=float, default=6)
+    parser.add_argument("--fixed-interval", type=float, default=60)
+    parser.add_argument("--inference-seconds", type=float, default=20, help="Model time per changed screen")
+    parser.add_argument("--min-interval", type=float, default=15)
+    parser.add_argument("--max-interval", type=float, default=300)
+    parser.add_argument("--budget", type=float, default=600, help="Model seconds per hour")
+    args = parser.parse_args()
+
+    sessions = sessions_from_store(args.db) if Path(args.db).exists() else []
+    if not sessions and not args.synthetic:
+        print(f"No recorded sessions in {args.db}; simulating 3 synthetic ones")
+        args.synthetic = 3
+    sessions += [synthetic_session(seed, args.hours) for seed in range(args.synthetic)]
+
+    totals = {"fixed": [0, 0], "adaptive": [0, 0]}
+    print(f"{'session':<28} {'changes':>7} | {'fixed runs':>10} {'ticks':>6} {'latency':>12} {'missed':>6} | "
+          f"{'adaptive runs':>13} {'ticks':>6} {'latency':>12} {'missed':>6}")
+    for session in sessions:
+        fixed_times = simulate_fixed(session, args.fixed_interval)
+        fixed_runs, fixed_latency, fixed_missed = observe(session, fixed_times)
+        adaptive_times, sampler = simulate_adaptive(
+            session, args.inference_seconds, min_interval=args.min_interval,
+            max_interval=args.max_interval, inference_budget=args.budget)
+        adaptive_runs, adaptive_latency, missed = observe(session, adaptive_times)
+        totals["fixed"][0] += fixed_runs
+        totals["fixed"][1] += len(fixed_times)
+        totals["adaptive"][0] += adaptive_runs
+        totals["adaptive"][1] += len(adaptive_times)
+        print(f"{session.name:<28} {len(session.times):>7} | {fixed_runs:>10} {len(fixed_times):>6} "
+              f"{describe(fixed_latency):>12} {fixed_missed:>6} | {adaptive_runs:>13} {len(adaptive_times):>6} "
+              f"{describe(adaptive_latency):>12} {missed:>6}")
+
+    fixed_runs, fixed_ticks = totals["fixed"]
+    adaptive_runs, adaptive_ticks = totals["adaptive"]
+    print(f"\nmodel invocations: {adaptive_runs} adaptive vs {fixed_runs} fixed "
+          f"({1 - adaptive_runs / max(1, fixed_runs):.0%} saved); "
+          f"captures: {adaptive_ticks} vs {fixed_ticks} ({1 - adaptive_ticks / max(1, fixed_ticks):.0%} saved)")
+
+
+if __name__ == "__main__":
+    main()
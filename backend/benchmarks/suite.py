@@ -0,0 +1,239 @@
+"""
+Run the hot-path microbenchmarks and compare them against a saved baseline.
+
+Covers screenshot preprocessing (dynamic_preprocess/load_image), Llama
+classification against the fake Ollama, loading analyses and building the
+schedule at growing history sizes, and the Canvas assignment merge. Results
+are written as JSON; with --baseline, any case whose median got slower than
+its threshold allows, or that no longer ran, makes the run exit with status 1.
+
+Run from the backend directory:
+    python benchmarks/suite.py --output bench_results.json
+    python benchmarks/suite.py --baseline bench_results.json --threshold 20
+"""
+import argparse
+import datetime
+import fnmatch
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+SCREENSHOT_DIR = Path(__file__).resolve().parent.parent / "backend" / "screenshots"
+
+# Default allowed slowdown of a case's median, in percent
+DEFAULT_THRESHOLD = 20.0
+
+# (group, factory, threshold); a factory yields (case name, callable, info dict)
+CASES = []
+
+
+def case(group, threshold=None):
+    """Register a case factory; ``threshold`` overrides --threshold for noisier cases."""
+    def register(factory):
+        CASES.append((group, factory, threshold))
+        return factory
+    return register
+
+
+@case("preprocess")
+def preprocess_cases(args):
+    import torch
+    from PIL import Image
+    from utils.internvl_loader import dynamic_preprocess, load_image
+
+    paths = sorted(glob.glob(str(SCREENSHOT_DIR / "*.png")))
+    if not paths:
+        raise FileNotFoundError(f"No screenshots found in {SCREENSHOT_DIR}")
+    for path in paths:
+        with Image.open(path) as image:
+            image = image.convert("RGB")
+        name = Path(path).stem
+        info = {"width": image.size[0], "height": image.size[1]}
+        yield (f"preprocess.dynamic_preprocess[{name}]",
+               lambda image=image: dynamic_preprocess(image, max_num=12, use_thumbnail=True), info)
+        # From the file, as the disk-based pipeline does
+        yield (f"preprocess.load_image[{name}]",
+               lambda path=path: load_image(path, max_num=12, dtype=torch.bfloat16), info)
+
+
+@case("classification", threshold=50.0)
+def classification_cases(args):
+    import analyze_screenshots as pipeline
+    from analysis_store import AnalysisStore
+    from benchmarks.fake_ollama import start_fake_ollama
+    from utils.verdict_classifier import TieredClassifier
+
+    server = start_fake_ollama(token_delay=args.token_delay)
+    pipeline.ollama_client.base_url = server.url
+    # No verdict cache hits or keyword rules: every call reaches the (fake) model
+    pipeline.verdict_classifier = TieredClassifier(pipeline.llm_classify)
+    pipeline.analysis_store = AnalysisStore(os.path.join(args.workdir, "classification.db"))
+    calls = iter(range(10 ** 9))
+    try:
+        yield ("classification.llama_classification",
+               lambda: pipeline.llama_classification(
+                   f"A PDF of lecture notes on linear algebra, page {next(calls)}.", "Studying linear algebra"),
+               {"token_delay": args.token_delay})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@case("schedule")
+def schedule_cases(args):
+    from benchmarks.bench_schedule_prompt import synthetic_analyses
+    from implement_study_plan import create_study_schedule, load_analyses_from_directory
+
+    for size in args.history_sizes:
+        analyses = synthetic_analyses(size)
+        directory = os.path.join(args.workdir, f"analyses_{size}")
+        os.makedirs(directory, exist_ok=True)
+        # One file per 100 analyses, like a long-running monitor writing batches
+        for start in range(0, size, 100):
+            with open(os.path.join(directory, f"analysis_{start:08d}.json"), "w") as f:
+                json.dump(analyses[start:start + 100], f)
+        yield (f"schedule.load_analyses_from_directory[{size}]",
+               lambda directory=directory: load_analyses_from_directory(directory), {"analyses": size})
+        yield (f"schedule.create_study_schedule[{size}]",
+               lambda analyses=analyses: create_study_schedule(analyses), {"analyses": size})
+
+
+@case("merge")
+def merge_cases(args):
+    from benchmarks.bench_schedule_merge import synthetic_semester
+    from Canvas_schedule_integration import merge_schedule_with_assignments
+
+    for size in args.assignment_sizes:
+        schedule, assignments = synthetic_semester(size, days=120, slots_per_day=200)
+        yield (f"merge.merge_schedule_with_assignments[{size}]",
+               lambda schedule=schedule, assignments=assignments:
+                   merge_schedule_with_assignments(schedule, assignments),
+               {"assignments": size, "days": 120, "slots_per_day": 200})
+
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "stdev_ms": statistics.stdev(samples) * 1000 if len(samples) > 1 else 0.0,
+        "runs": repeat,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(args):
+    results, skipped = {}, {}
+    for group, factory, threshold in CASES:
+        try:
+            with closing(factory(args)) as cases:
+                for name, fn, info in cases:
+                    if not selected(name, args.only):
+                        continue
+                    result = measure(fn, args.repeat)
+                    result.update(info=info, threshold_pct=threshold or args.threshold)
+                    results[name] = result
+                    print(f"{name:<58} {result['median_ms']:10.2f} ms  (min {result['min_ms']:.2f})")
+        except Exception as e:
+            # A missing model dependency or screenshot only skips its own group
+            skipped[group] = f"{type(e).__name__}: {e}"
+            print(f"{group + '.*':<58} skipped: {skipped[group]}")
+    return {"environment": environment(), "results": results, "skipped": skipped}
+
+
+def selected(name, patterns):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def compare(current, baseline, patterns=("*",)):
+    """
+    Return (name, baseline ms, current ms, change %) for every case over its
+    threshold. A selected baseline case that no longer produced a result (it
+    crashed or its group was skipped) counts too, with current ms None.
+    """
+    regressions = []
+    for name, old in baseline.get("results", {}).items():
+        if name not in current["results"] and selected(name, patterns):
+            regressions.append((name, old["median_ms"], None, None))
+            group = name.split(".", 1)[0]
+            reason = current["skipped"].get(group, "no result")
+            print(f"{name:<58} {old['median_ms']:10.2f} ->    missing  REGRESSION ({reason})")
+    for name, result in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            continue
+        change = (result["median_ms"] / old["median_ms"] - 1) * 100
+        marker = ""
+        if change > result["threshold_pct"]:
+            regressions.append((name, old["median_ms"], result["median_ms"], change))
+            marker = "  REGRESSION"
+        print(f"{name:<58} {old['median_ms']:10.2f} -> {result['median_ms']:10.2f} ms {change:+7.1f}%{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per case (after one warm-up)")
+    parser.add_argument("--only", nargs="+", default=["*"], help="Glob patterns of case names to run")
+    parser.add_argument("--history-sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--assignment-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Fake Ollama seconds per token")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed median slowdown in percent before a case counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_suite_") as workdir:
+        args.workdir = workdir
+        current = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.baseline} ({baseline['environment'].get('commit')}, "
+              f"{baseline['environment'].get('timestamp')}):")
+        regressions = compare(current, baseline, args.only)
+        if regressions:
+            print(f"{len(regressions)} case(s) regressed beyond their threshold")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
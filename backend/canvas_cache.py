@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+
+from canvas_client import CanvasError
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached response is served without contacting Canvas
+DEFAULT_TTLS = {
+    "courses": 3600,
+    "assignments": 300,
+    "announcements": 120,
+}
+DEFAULT_TTL = 300
+
+# Seconds past the TTL during which stale data is still served while a
+# background revalidation runs
+DEFAULT_STALE_TTL = 600
+
+
+class CacheEntry:
+    """Cached collection plus the validators of every page it was built from."""
+    def __init__(self, data, pages):
+        self.data = data
+        self.validators = [(page.url, page.etag, page.last_modified) for page in pages]
+        self.fetched_at = time.monotonic()
+        self.refreshing = False
+
+    def age(self):
+        return time.monotonic() - self.fetched_at
+
+
+class CanvasCache:
+    """
+    TTL cache in front of CanvasClient collection fetches.
+
+    Fresh entries are answered from memory. Entries past their TTL but inside the
+    stale window are still answered from memory while a background thread
+    revalidates them with If-None-Match / If-Modified-Since; expired entries are
+    revalidated inline. A revalidation that gets 304 on every page only bumps
+    the entry's timestamp, so unchanged data is never re-downloaded.
+    """
+
+    def __init__(self, client, ttls=None, stale_ttl=DEFAULT_STALE_TTL, on_change=None):
+        """
+        :param client: CanvasClient used to talk to Canvas.
+        :param ttls: Mapping of resource name to TTL in seconds (merged over DEFAULT_TTLS).
+        :param stale_ttl: Seconds past the TTL stale data may still be served.
+        :param on_change: Optional callback(resource, data) run whenever new data is fetched.
+        """
+        self.client = client
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.stale_ttl = stale_ttl
+        self.on_change = on_change
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+            "refreshed": 0,
+            "errors": 0,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, resource, path, params=None):
+        """
+        Return the collection at ``path``, served from cache when possible.
+
+        :param resource: Resource name used to pick the TTL (e.g. "assignments").
+        :param path: Canvas API path, relative to the client's base URL.
+        :param params: Optional query parameters.
+        """
+        key = (resource, path, tuple(sorted((params or {}).items())))
+        ttl = self.ttls.get(resource, DEFAULT_TTL)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = entry.age()
+                if age < ttl:
+                    self._stats["hits"] += 1
+                    return entry.data
+                if age < ttl + self.stale_ttl:
+                    self._stats["stale_hits"] += 1
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        threading.Thread(
+                            target=self._background_refresh,
+                            args=(key, resource, path, params, entry),
+                            daemon=True
+                        ).start()
+                    return entry.data
+            self._stats["misses"] += 1
+
+        return self._refresh(key, resource, path, params, entry)
+
+    def _background_refresh(self, key, resource, path, params, entry):
+        try:
+            self._refresh(key, resource, path, params, entry)
+        except CanvasError as e:
+            logger.warning(f"Background revalidation of {path} failed: {e}")
+        finally:
+            entry.refreshing = False
+
+    def _refresh(self, key, resource, path, params, entry):
+        """Revalidate ``entry`` (if any) and fall back to a full fetch when it changed."""
+        try:
+            if entry is not None and self._not_modified(entry):
+                self._count("not_modified")
+                with self._lock:
+                    entry.fetched_at = time.monotonic()
+                return entry.data
+
+            pages = self.client.get_pages(path, params)
+        except CanvasError:
+            self._count("errors")
+            if entry is not None:
+                # Better stale than nothing while Canvas is unreachable
+                logger.warning(f"Serving stale {resource} after Canvas error")
+                return entry.data
+            raise
+
+        data = []
+        for page in pages:
+            data.extend(page.items)
+        with self._lock:
+            self._entries[key] = CacheEntry(data, pages)
+            self._stats["refreshed"] += 1
+        if self.on_change is not None:
+            self.on_change(resource, data)
+        return data
+
+    def _not_modified(self, entry):
+        """Return True if Canvas answers 304 for every page of ``entry``."""
+        if not entry.validators:
+            return False
+        for url, etag, last_modified in entry.validators:
+            headers = {}
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+            if not headers:
+                return False
+            if self.client.fetch_page(url, headers=headers) is not None:
+                return False
+        return True
+
+    def invalidate(self, resource=None):
+        """Drop cached entries, either all of them or those of one resource."""
+        with self._lock:
+            if resource is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == resource]:
+                    del self._entries[key]
+
+    def stats(self):
+        """Return hit/miss counters and the number of cached entries."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        return stats
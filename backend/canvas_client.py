@@ -0,0 +1,165 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Canvas caps per_page at 100 for most collection endpoints
+DEFAULT_PER_PAGE = 100
+MAX_PER_PAGE = 100
+
+
+class CanvasError(Exception):
+    """Raised when Canvas returns an error status or an unreadable body"""
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CanvasPage:
+    """A single page of a Canvas collection response."""
+    def __init__(self, url, items, etag=None, last_modified=None, links=None):
+        self.url = url
+        self.items = items
+        self.etag = etag
+        self.last_modified = last_modified
+        self.links = links or {}
+
+
+class CanvasClient:
+    """
+    Canvas REST client sharing one keep-alive connection pool between calls.
+
+    Collection endpoints are followed through their ``Link: rel="next"`` headers,
+    so callers always get the complete result instead of only the first page.
+    """
+
+    def __init__(self, api_url, api_token, per_page=DEFAULT_PER_PAGE, pool_size=10,
+                 max_workers=4, timeout=30, retries=3):
+        """
+        :param api_url: Base URL of the Canvas API, e.g. https://canvas.example/api/v1
+        :param api_token: Canvas access token.
+        :param per_page: Page size requested from collection endpoints (capped at 100).
+        :param pool_size: Number of keep-alive connections kept per host.
+        :param max_workers: Threads used by the concurrent page fetcher.
+        :param timeout: Per-request timeout in seconds.
+        :param retries: Retries for connection errors and 429/5xx responses.
+        """
+        self.api_url = api_url.rstrip("/")
+        self.per_page = max(1, min(per_page, MAX_PER_PAGE))
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_token}",
+            "Accept": "application/json"
+        })
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"])
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _url(self, path):
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.api_url}/{path.lstrip('/')}"
+
+    def _params(self, params):
+        params = dict(params or {})
+        params.setdefault("per_page", self.per_page)
+        return params
+
+    def request(self, url, params=None, headers=None):
+        """Send a GET on the pooled session and return the raw response."""
+        try:
+            return self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise CanvasError(f"Request to {url} failed: {e}") from e
+
+    def fetch_page(self, url, params=None, headers=None):
+        """
+        Fetch one page and wrap it as a CanvasPage.
+
+        :return: CanvasPage, or None if the server answered 304 Not Modified.
+        """
+        response = self.request(url, params=params, headers=headers)
+        if response.status_code == 304:
+            return None
+        if response.status_code != 200:
+            raise CanvasError(f"Failed to fetch {url} (HTTP {response.status_code})",
+                              status_code=response.status_code)
+        try:
+            items = response.json()
+        except ValueError as e:
+            raise CanvasError(f"Received invalid JSON response from {url}") from e
+        return CanvasPage(
+            url=response.url,
+            items=items,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            links=response.links
+        )
+
+    def get(self, path, params=None):
+        """Fetch a single (non-paginated) resource."""
+        return self.fetch_page(self._url(path), params=params).items
+
+    def get_pages(self, path, params=None):
+        """
+        Fetch every page of a collection.
+
+        When Canvas advertises a numeric rel="last" page, the remaining pages are
+        requested concurrently; otherwise (bookmark pagination) they are followed
+        one after another.
+        """
+        first = self.fetch_page(self._url(path), params=self._params(params))
+        if "next" not in first.links:
+            return [first]
+
+        last_page = _page_number(first.links.get("last", {}).get("url"))
+        if last_page is None or self.max_workers <= 1:
+            pages = [first]
+            page = first
+            while "next" in page.links:
+                page = self.fetch_page(page.links["next"]["url"])
+                pages.append(page)
+            return pages
+
+        logger.debug(f"Fetching pages 2-{last_page} of {path} concurrently")
+        page_params = self._params(params)
+        def fetch(number):
+            return self.fetch_page(self._url(path), params={**page_params, "page": number})
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            rest = list(executor.map(fetch, range(2, last_page + 1)))
+        return [first] + rest
+
+    def get_all(self, path, params=None):
+        """Fetch every item of a collection as one flat list."""
+        items = []
+        for page in self.get_pages(path, params):
+            items.extend(page.items)
+        return items
+
+    def close(self):
+        self.session.close()
+
+
+def _page_number(url):
+    """Return the numeric ``page`` query parameter of a link, or None for bookmarks."""
+    if not url:
+        return None
+    values = parse_qs(urlparse(url).query).get("page")
+    if not values or not values[0].isdigit():
+        return None
+    return int(values[0])
@@ -0,0 +1,218 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from canvas_cache import CanvasCache
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assignments (
+    id INTEGER PRIMARY KEY,
+    course_id TEXT NOT NULL,
+    name TEXT,
+    due_at TEXT,
+    points_possible REAL,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_assignments_course_due ON assignments (course_id, due_at);
+CREATE INDEX IF NOT EXISTS idx_assignments_course_updated ON assignments (course_id, updated_at);
+
+CREATE TABLE IF NOT EXISTS announcements (
+    id INTEGER PRIMARY KEY,
+    course_id TEXT NOT NULL,
+    title TEXT,
+    posted_at TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_announcements_course_posted ON announcements (course_id, posted_at);
+CREATE INDEX IF NOT EXISTS idx_announcements_course_updated ON announcements (course_id, updated_at);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    watermark TEXT,
+    synced_at REAL,
+    PRIMARY KEY (resource, course_id)
+);
+"""
+
+
+def _updated_at(record):
+    """Change timestamp of a Canvas record (announcements have no updated_at)."""
+    return record.get("updated_at") or record.get("posted_at") or record.get("created_at") or ""
+
+
+class CanvasStore:
+    """
+    Embedded SQLite store for Canvas assignments and announcements.
+
+    Rows keep the full Canvas JSON in ``data`` alongside indexed columns for the
+    fields the API filters and sorts on.
+    """
+
+    def __init__(self, db_path="canvas.db"):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def get_sync_state(self, resource, course_id):
+        """Return (watermark, synced_at) for a resource, or (None, None) if never synced."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT watermark, synced_at FROM sync_state WHERE resource = ? AND course_id = ?",
+                (resource, str(course_id))
+            ).fetchone()
+        return row if row else (None, None)
+
+    def known_ids(self, resource, course_id):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id FROM {resource} WHERE course_id = ?", (str(course_id),)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def upsert(self, resource, course_id, records, watermark, removed=()):
+        """
+        Insert or replace ``records``, delete the ``removed`` ids and advance the
+        resource's watermark in one transaction.
+        """
+        course_id = str(course_id)
+        if resource == "assignments":
+            sql = ("INSERT OR REPLACE INTO assignments "
+                   "(id, course_id, name, due_at, points_possible, updated_at, data) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?)")
+            rows = [(r["id"], course_id, r.get("name"), r.get("due_at"), r.get("points_possible"),
+                     _updated_at(r), json.dumps(r)) for r in records]
+        else:
+            sql = ("INSERT OR REPLACE INTO announcements "
+                   "(id, course_id, title, posted_at, updated_at, data) "
+                   "VALUES (?, ?, ?, ?, ?, ?)")
+            rows = [(r["id"], course_id, r.get("title"), r.get("posted_at"),
+                     _updated_at(r), json.dumps(r)) for r in records]
+
+        with self.lock, self.conn:
+            self.conn.executemany(sql, rows)
+            self.conn.executemany(f"DELETE FROM {resource} WHERE id = ? AND course_id = ?",
+                                  [(record_id, course_id) for record_id in removed])
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (resource, course_id, watermark, synced_at) "
+                "VALUES (?, ?, ?, ?)",
+                (resource, course_id, watermark, time.time())
+            )
+
+    def get_assignments(self, course_id, due_after=None, due_before=None):
+        """Assignments of a course ordered by due date, optionally limited to a due_at range."""
+        sql = "SELECT data FROM assignments WHERE course_id = ?"
+        args = [str(course_id)]
+        if due_after:
+            sql += " AND due_at >= ?"
+            args.append(due_after)
+        if due_before:
+            sql += " AND due_at < ?"
+            args.append(due_before)
+        sql += " ORDER BY due_at"
+        with self.lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_announcements(self, course_id, since=None):
+        """Announcements of a course, newest first, optionally only those changed since ``since``."""
+        sql = "SELECT data FROM announcements WHERE course_id = ?"
+        args = [str(course_id)]
+        if since:
+            sql += " AND updated_at >= ?"
+            args.append(since)
+        sql += " ORDER BY posted_at DESC"
+        with self.lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+class SyncEngine:
+    """
+    Keeps a CanvasStore in step with Canvas.
+
+    Collections are pulled through a CanvasCache, so an unchanged collection
+    costs only conditional 304 requests, and only records that are new or whose
+    change timestamp is past the stored watermark are written to the store.
+    """
+
+    def __init__(self, store, client, min_interval=300):
+        """
+        :param store: CanvasStore to sync into.
+        :param client: CanvasClient used to reach Canvas.
+        :param min_interval: Seconds between background syncs of the same course.
+        """
+        self.store = store
+        self.cache = CanvasCache(client)
+        self.min_interval = min_interval
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def _fetch(self, resource, course_id):
+        if resource == "assignments":
+            return self.cache.get("assignments", f"courses/{course_id}/assignments")
+        return self.cache.get("announcements", "announcements",
+                              {"context_codes[]": f"course_{course_id}"})
+
+    def sync(self, resource, course_id):
+        """
+        Pull ``resource`` for a course, upsert the changed records and delete
+        the ones Canvas no longer returns (every fetch is the full collection).
+
+        :return: Number of records written to the store.
+        """
+        watermark, _ = self.store.get_sync_state(resource, course_id)
+        records = self._fetch(resource, course_id) or []
+        known = self.store.known_ids(resource, course_id)
+
+        changed = [r for r in records
+                   if r["id"] not in known or _updated_at(r) > (watermark or "")]
+        removed = known - {r["id"] for r in records}
+        new_watermark = max([watermark or ""] + [_updated_at(r) for r in records])
+        self.store.upsert(resource, course_id, changed, new_watermark, removed)
+        logger.info(f"Synced {len(changed)} of {len(records)} {resource} for course {course_id}"
+                    + (f", removed {len(removed)}" if removed else ""))
+        return len(changed)
+
+    def _sync_in_background(self, resource, course_id):
+        try:
+            self.sync(resource, course_id)
+        except Exception as e:
+            logger.error(f"Background sync of {resource} for course {course_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._running.discard((resource, course_id))
+
+    def ensure_fresh(self, resource, course_id):
+        """
+        Make sure the store can answer for a course.
+
+        A course that was never synced is synced inline; one whose last sync is
+        older than ``min_interval`` is refreshed on a background thread while the
+        caller reads the current rows.
+        Raises:
+            CanvasError: If the inline first sync failed (a course without sync
+                state has no stored rows to fall back on)
+        """
+        _, synced_at = self.store.get_sync_state(resource, course_id)
+        if synced_at is None:
+            self.sync(resource, course_id)
+            return
+        if time.time() - synced_at < self.min_interval:
+            return
+        key = (resource, str(course_id))
+        with self._lock:
+            if key in self._running:
+                return
+            self._running.add(key)
+        threading.Thread(target=self._sync_in_background, args=key, daemon=True).start()
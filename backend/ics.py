@@ -2,8 +2,7 @@
 import json
 import os
 import datetime
-import pytz
-from icalendar import Calendar, Event
+from utils.ics_writer import ICSWriter
 from langchain_ollama import OllamaLLM
 from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
@@ -23,19 +22,14 @@ optimized_schedule = {
     }
 }
 
-def export_to_ics(optimized_schedule, filename="study_schedule.ics"):
-    cal = Calendar()
-    timezone = pytz.timezone("America/Toronto")
-
-    for date, time_slots in optimized_schedule.schedule.items():
-        for time, task in time_slots.items():
-            event = Event()
-            event.add('summary', task)
-            event_date = datetime.datetime.strptime(f"{date} {time}", "%Y-%m-%d %I:%M %p")
-            event.add('dtstart', timezone.localize(event_date))
-            event.add('dtend', timezone.localize(event_date + datetime.timedelta(minutes=30)))
-            cal.add_component(event)
-
-    with open(filename, 'wb') as f:
-        f.write(cal.to_ical())
-    print(f"ICS file created: {filename}")
\ No newline at end of file
+def export_to_ics(optimized_schedule, filename="study_schedule.ics", incremental=False):
+    writer = ICSWriter(timezone="America/Toronto")
+    events = (
+        (date, time, task)
+        for date, time_slots in optimized_schedule.schedule.items()
+        for time, task in time_slots.items()
+    )
+    counts = writer.write(events, filename, incremental=incremental)
+    print(f"ICS file created: {filename} ({counts['added']} added, {counts['changed']} changed, "
+          f"{counts['unchanged']} unchanged, {counts['removed']} removed)")
+    return counts
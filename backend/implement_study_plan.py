@@ -1,19 +1,13 @@
 import json
 import os
-from pydantic import BaseModel, Field
-from typing import Dict
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+import numpy as np
 from langchain_ollama import OllamaLLM
+from analysis_store import AnalysisStore
+from schedule_registry import write_schedule
 import time
 
 #cmd prompt: ollama pull mistral
 
-# Define the Pydantic model for expected JSON output
-class StudySchedule(BaseModel):
-    schedule: Dict[str, bool] = Field(..., description="Schedule for 24 hours")
-    explanation: str = Field(..., description="Explanation of how the schedule optimizes productivity")
-
 # Load analyses from the directory
 def load_analyses_from_directory(directory_path):
     if not os.path.exists(directory_path):
@@ -45,107 +39,250 @@ def load_analyses_from_directory(directory_path):
     return all_analyses
 
 
-# Generate a study schedule using Ollama
-def create_study_schedule(analyses):
-    analysis_data = "\n".join([json.dumps(analysis) for analysis in analyses])  # Convert JSON to string format
+# Hours (0-23) the engine may schedule study in; nights are left free
+DEFAULT_STUDY_WINDOW = tuple(range(8, 23))
+DEFAULT_STUDY_HOURS = 5
 
-    print("Analysis data: ", analysis_data)  # Debugging print
+# Pseudo-samples pulling hours with little data towards a 50% productivity rate
+PRIOR_WEIGHT = 1.0
 
-    hours = "5"  # This could be dynamic from frontend
-    hoursofstudy = "user dependent"  # This could be dynamic from frontend
-    allocate_string = "allocate"
-    prompt = f"""
-    You are a productivity coach analyzing the user's screen activity patterns to create an optimized study schedule.
-    
-    1. Identify productive and procrastination hours using the "Verdict" field.
-    2. Allocate focused study time in 1 hour intervals during productive hours.
-    3. Add extra {hoursofstudy} dependent on user's study habits to the schedule for a total of at least {hours} hours of study time.
-    4. Add extra {hoursofstudy} in slots that are non-productive hours for a total of at least {hours} hours of study time.
-    5. Check for less than {hours} hours of study time.
-    6. Change {allocate_string} to {hours} hours of study time.
-
-
-    Data collected from user's screen activity:
-    {analysis_data}
-
-    Return output in Json format and nothing else and remove all comments including backslashes and remove all elipses.:
-
-    {{
-        "schedule": {{
-            "01:00 am": true or false,
-            ...
-            "11:00 pm": true or false
-        }},
-        "explanation": "Detailed explanation on how the schedule optimizes productivity."
-    }}
-    """
+def format_hour(hour):
+    """0 -> '12:00 am', 13 -> '01:00 pm' (the schedule's key format)."""
+    return f"{hour % 12 or 12:02d}:00 {'am' if hour < 12 else 'pm'}"
 
-    # Initialize LangChain's Ollama LLM
-    llm = OllamaLLM(model="mistral")  # Alternative model
+def _timestamp_chars(timestamps):
+    """"YYYY-MM-DD HH:MM:SS" strings as an (n, 19) uint8 character matrix."""
+    raw = np.asarray(timestamps, dtype="S19")
+    return raw.view(np.uint8).reshape(-1, 19)
 
-    # Create the JSON Output Parser
-    json_parser = JsonOutputParser(pydantic_object=StudySchedule)
+def _digits(chars, first, last):
+    """Characters first..last (inclusive) of every row as one integer column."""
+    value = chars[:, first].astype(np.int32) - ord("0")
+    for column in range(first + 1, last + 1):
+        value = value * 10 + (chars[:, column] - ord("0"))
+    return value
 
-    # Build the prompt template
-    template = PromptTemplate(
-        template="{format_instructions}\n{prompt}",
-        input_variables=["prompt"],
-        partial_variables={"format_instructions": json_parser.get_format_instructions()},
-    )
+def timestamp_hours(chars):
+    return _digits(chars, 11, 12)
 
-    # Format the template
-    formatted_prompt = template.format(prompt=prompt)
+def timestamp_weekdays(chars):
+    """Weekday (Monday = 0) of every row, via days since 1970-01-01 (a Thursday)."""
+    year = _digits(chars, 0, 3)
+    month = _digits(chars, 5, 6)
+    day = _digits(chars, 8, 9)
 
-    try:
-        # Use LangChain to send prompt to Ollama
-        print("Sending request to LLaMA 3 with LangChain...")
-        response = llm.invoke(formatted_prompt)  # Ensure Ollama supports this method
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+    return (days + 3) % 7
 
-        # Parse the JSON response
-        parsed_response = json_parser.parse(response)
+def productivity_profile(timestamps, verdicts, by_weekday=False):
+    """
+    Bin samples into hours of the day (or weekday x hour).
 
-        print(parsed_response)  # Debugging
-        return parsed_response
+    :param timestamps: "YYYY-MM-DD HH:MM:SS" strings.
+    :param verdicts: Matching booleans, True meaning procrastination.
+    :return: (samples, productive) count arrays of shape (24,) or (7, 24).
+    """
+    size = 7 * 24 if by_weekday else 24
+    chars = _timestamp_chars(timestamps)
+    bins = timestamp_hours(chars)
+    if by_weekday:
+        bins = timestamp_weekdays(chars) * 24 + bins
+    productive = ~np.fromiter(verdicts, dtype=bool, count=len(verdicts))
+    samples = np.bincount(bins, minlength=size)
+    productive_samples = np.bincount(bins, weights=productive, minlength=size)
+    shape = (7, 24) if by_weekday else (24,)
+    return samples.reshape(shape), productive_samples.reshape(shape)
+
+def select_study_hours(samples, productive, study_hours=DEFAULT_STUDY_HOURS, window=DEFAULT_STUDY_WINDOW):
+    """
+    Pick the study_hours hours in window with the highest smoothed productivity rate.
+
+    Ties go to the hour with more evidence, then to the earlier hour, so the
+    result only depends on the data.
+    """
+    window = np.asarray(window)
+    rate = (productive[window] + 0.5 * PRIOR_WEIGHT) / (samples[window] + PRIOR_WEIGHT)
+    # lexsort sorts by the last key first
+    order = np.lexsort((window, -samples[window], -rate))
+    return sorted(int(hour) for hour in window[order[:study_hours]]), rate
+
+# Upper bound on the explanation prompt, whatever the size of the history
+DEFAULT_PROMPT_TOKEN_BUDGET = 1024
+MAX_JUSTIFICATIONS = 6
+MAX_JUSTIFICATION_CHARS = 240
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English with Llama/Mistral tokenizers)."""
+    return len(text) // 4 + 1
+
+def pick_justifications(analyses, limit=MAX_JUSTIFICATIONS):
+    """
+    Most recent distinct justifications, alternating between productive and
+    procrastination samples so both sides are represented.
+    """
+    by_verdict = {True: [], False: []}
+    seen = set()
+    for analysis in reversed(analyses):
+        text = (analysis.get("Justification") or "").strip()
+        verdict = bool(analysis.get("Verdict"))
+        if text and text not in seen and len(by_verdict[verdict]) < limit:
+            seen.add(text)
+            by_verdict[verdict].append((verdict, text))
+        if all(len(picked) >= limit for picked in by_verdict.values()):
+            break
+    interleaved = [item for pair in zip(by_verdict[False], by_verdict[True]) for item in pair]
+    longer = by_verdict[False] if len(by_verdict[False]) > len(by_verdict[True]) else by_verdict[True]
+    interleaved += longer[len(interleaved) // 2:]
+    return interleaved[:limit]
+
+def _hour_table(samples, productive, hours):
+    """'Hour | samples | productive %' rows for ``hours``."""
+    rows = ["Hour | samples | productive %"]
+    for hour in hours:
+        count = int(samples[hour])
+        rate = f"{productive[hour] / count:.0%}" if count else "-"
+        rows.append(f"{format_hour(hour)} | {count} | {rate}")
+    return "\n".join(rows)
+
+def _hour_line(samples, productive, hours):
+    """The same data on one line, e.g. '08 am 12/45%; 09 am 3/0%'."""
+    return "Hour samples/productive %: " + "; ".join(
+        f"{format_hour(hour).replace(':00', '')} {int(samples[hour])}/{productive[hour] / samples[hour]:.0%}"
+        for hour in hours)
+
+def compact_history(samples, productive, chosen_hours, justifications=(),
+                    token_budget=DEFAULT_PROMPT_TOKEN_BUDGET):
+    """
+    Summarize the activity history into a prompt of bounded size.
+
+    The per-hour summary doesn't grow with the number of analyses. If the full
+    24-row table doesn't fit ``token_budget``, hours without samples are left
+    out, then the rows are packed onto one line, then only the scheduled hours
+    are kept. Representative justifications are added, trimmed, with whatever
+    budget remains. The instructions and the scheduled hours (about 80 tokens)
+    are always included, so smaller budgets can't be met.
+    """
+    intro = ("You are a productivity coach. Write a short, encouraging explanation of the study schedule below "
+             "for the student, based on their observed screen activity. Do not change any hours or numbers.\n\n"
+             f"Total samples: {int(samples.sum())}\n")
+    outro = "\n\nScheduled study hours: " + ", ".join(format_hour(hour) for hour in chosen_hours)
+
+    sampled = [hour for hour in range(24) if samples[hour]]
+    scheduled = [hour for hour in chosen_hours if samples[hour]]
+    tables = [
+        _hour_table(samples, productive, range(24)),
+        _hour_table(samples, productive, sampled) + "\n(hours without samples omitted)",
+        _hour_line(samples, productive, sampled),
+        _hour_line(samples, productive, scheduled),
+    ]
+    prompt = intro.rstrip("\n") + outro
+    for table in tables:
+        if estimate_tokens(intro + table + outro) <= token_budget:
+            prompt = intro + table + outro
+            break
+
+    if justifications:
+        header = "\n\nRepresentative observations:"
+        if estimate_tokens(prompt + header) < token_budget:
+            prompt += header
+            for verdict, text in justifications:
+                label = "procrastination" if verdict else "productive"
+                line = f"\n- [{label}] {text[:MAX_JUSTIFICATION_CHARS]}"
+                if estimate_tokens(prompt + line) > token_budget:
+                    break
+                prompt += line
+    return prompt
+
+def explain_schedule(chosen_hours, samples, productive, use_llm=False, justifications=(),
+                     token_budget=DEFAULT_PROMPT_TOKEN_BUDGET):
+    """
+    Describe the schedule. The deterministic text is always available; with
+    use_llm the mistral model is asked to phrase it from a compacted,
+    budget-bounded summary of the history instead.
+    """
+    total = int(samples.sum())
+    rate = productive.sum() / total if total else 0.0
+    best = ", ".join(
+        f"{format_hour(h)} ({int(productive[h])}/{int(samples[h])} productive)" for h in chosen_hours
+    )
+    explanation = (
+        f"Based on {total} screen samples ({rate:.0%} productive overall), study time is placed in the "
+        f"hours with the highest productivity rate: {best}."
+    )
+    if not use_llm:
+        return explanation
 
+    try:
+        llm = OllamaLLM(model="mistral")
+        prompt = compact_history(samples, productive, chosen_hours, justifications, token_budget)
+        return llm.invoke(prompt).strip() or explanation
     except Exception as e:
-        print(f"Error during request: {e}")
-        return None
+        print(f"Error during explanation request: {e}")
+        return explanation
+
+def schedule_from_verdicts(timestamps, verdicts, study_hours=DEFAULT_STUDY_HOURS, weekday=None,
+                           window=DEFAULT_STUDY_WINDOW, use_llm=False, justifications=(),
+                           token_budget=DEFAULT_PROMPT_TOKEN_BUDGET):
+    """
+    Build a 24-hour study schedule directly from (Timestamp, Verdict) data.
+
+    :param weekday: If given (Monday = 0), use only that weekday's profile.
+    :param use_llm: Let mistral write the explanation text (the schedule itself never uses the LLM).
+    :param justifications: (verdict, text) pairs quoted in the explanation prompt.
+    :param token_budget: Upper bound on the explanation prompt size.
+    :return: {"schedule": {hour_key: bool}, "explanation": str}
+    """
+    if weekday is None:
+        samples, productive = productivity_profile(timestamps, verdicts)
+    else:
+        samples, productive = productivity_profile(timestamps, verdicts, by_weekday=True)
+        samples, productive = samples[weekday], productive[weekday]
+
+    chosen_hours, _ = select_study_hours(samples, productive, study_hours, window)
+    chosen = set(chosen_hours)
+    return {
+        "schedule": {format_hour(hour): hour in chosen for hour in range(24)},
+        "explanation": explain_schedule(chosen_hours, samples, productive, use_llm,
+                                        justifications, token_budget),
+    }
+
+# Generate a study schedule from analyses
+def create_study_schedule(analyses, study_hours=DEFAULT_STUDY_HOURS, weekday=None, use_llm=False,
+                          token_budget=DEFAULT_PROMPT_TOKEN_BUDGET):
+    timestamps = [analysis["Timestamp"] for analysis in analyses]
+    verdicts = [bool(analysis.get("Verdict")) for analysis in analyses]
+    justifications = pick_justifications(analyses) if use_llm else ()
+    return schedule_from_verdicts(timestamps, verdicts, study_hours, weekday, use_llm=use_llm,
+                                  justifications=justifications, token_budget=token_budget)
 
 # Main function to run the schedule creator
 import time  # Import time for unique filenames
 
-def run_schedule_creator():
+def run_schedule_creator(start=None, end=None, study_hours=DEFAULT_STUDY_HOURS, use_llm=False):
     analyses_directory = "analyses"
     output_directory = "backend_schedules"  # Directory to store backend JS schedules
     os.makedirs(output_directory, exist_ok=True)  # Ensure the directory exists
 
-    all_analyses = load_analyses_from_directory(analyses_directory)
-
-    print(f"Analyses: {json.dumps(all_analyses, indent=2)}")  # Debugging
+    # Range query on the analysis store; legacy JSON files are imported on first use
+    store = AnalysisStore("analyses.db", legacy_dir=analyses_directory)
+    samples = store.verdicts(start, end)
+    print(f"Building schedule from {len(samples)} analyses")
 
-    schedule = create_study_schedule(all_analyses)
+    timestamps = [timestamp for timestamp, _ in samples]
+    verdicts = [verdict for _, verdict in samples]
+    justifications = store.latest_justifications(MAX_JUSTIFICATIONS, start, end) if use_llm else ()
+    schedule = schedule_from_verdicts(timestamps, verdicts, study_hours, use_llm=use_llm,
+                                      justifications=justifications)
 
     if schedule:
-        try:
-            # Convert Pydantic object to dictionary if necessary
-            if isinstance(schedule, StudySchedule):
-                schedule = schedule.dict()
-
-            # Generate a unique filename using timestamp
-            filename = f"study_schedule_{int(time.time())}.js"
-            file_path = os.path.join(output_directory, filename)
-
-            # Convert dictionary to a Node.js-compatible module export
-            js_content = f"module.exports = {json.dumps(schedule, indent=2)};"
-
-            # Write to JS file
-            with open(file_path, "w") as js_file:
-                js_file.write(js_content)
-
-            print(f"Generated Study Schedule saved to {file_path}")
-
-        except json.JSONDecodeError as e:
-            print("JSON Parsing Error:", e)
+        # JSON for the API's schedule registry, plus the Node.js module export
+        file_path = write_schedule(output_directory, schedule, int(time.time()))
+        print(f"Generated Study Schedule saved to {file_path}")
     else:
         print("Error during schedule creation")
 
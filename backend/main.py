@@ -1,15 +1,18 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from scrape2 import get_announcements, get_assignments, get_courses, select_course
-from implement_study_plan import run_schedule_creator
+from typing import Optional
+from scrape2 import get_courses, select_course, cache as canvas_cache, client as canvas_client
+from canvas_client import CanvasError
+from canvas_sync import CanvasStore, SyncEngine
 import json
 import os
+import sys
 import logging
 from pydantic import BaseModel
-from analyze_screenshots import create_definition, run_pipeline, get_latest_screenshot, cleanup_model, internvl_model
-
-# Add a global variable to track analysis state
-is_analysis_running = False
+from analysis_jobs import DEFAULT_SESSION, JobManager, SessionQueueFull
+from analysis_sessions import SessionRegistry
+from schedule_registry import ScheduleRegistry
+from utils.pipeline_metrics import render_prometheus
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +20,22 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# Local store for assignments/announcements, kept in sync incrementally
+canvas_store = CanvasStore("canvas.db")
+sync_engine = SyncEngine(canvas_store, canvas_client)
+
+# Analyses from all sessions share a bounded worker pool with round-robin
+# queuing across sessions, so the event loop stays free and no session starves.
+# In-process InternVL serves one generation at a time, so more than one worker
+# only pays off when generation runs in INFERENCE_WORKERS separate processes
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0"))
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", str(max(1, INFERENCE_WORKERS))))
+job_manager = JobManager(max_workers=ANALYSIS_WORKERS)
+sessions = SessionRegistry()
+
+# Latest generated study schedule, parsed once and reloaded when the files change
+schedule_registry = ScheduleRegistry(os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend_schedules"))
+
 # Configure CORS with more permissive settings
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +51,9 @@ app.add_middleware(
 
 class StudyTopic(BaseModel):
     text: str
+    session_id: Optional[str] = None
+    # Return the per-stage timings alongside the analysis result
+    trace: bool = False
 
 @app.get("/")
 def home():
@@ -40,7 +62,7 @@ def home():
 @app.get("/api/courses")
 def fetch_courses():
     try:
-        courses = get_courses()
+        courses = get_courses(cached=True)
         print("Fetched courses:", courses)  # Debug print
         if courses is None:
             raise HTTPException(status_code=404, detail="No courses found")
@@ -49,107 +71,213 @@ def fetch_courses():
         print("Error in fetch_courses:", str(e))  # Debug print
         raise HTTPException(status_code=500, detail=str(e))
 
+def ensure_synced(resource, course_id):
+    """Sync a course's resource if needed, turning an unreachable Canvas into a 502/503."""
+    try:
+        sync_engine.ensure_fresh(resource, course_id)
+    except CanvasError as e:
+        logger.error(f"Could not sync {resource} for course {course_id}: {e}")
+        raise HTTPException(status_code=502 if e.status_code else 503,
+                            detail=f"Canvas is unavailable and no {resource} are stored yet: {e}")
+
 @app.get("/api/announcements")
-def fetch_announcements():
-    announcements = get_announcements()
+def fetch_announcements(course_id: str, since: Optional[str] = None):
+    ensure_synced("announcements", course_id)
+    announcements = canvas_store.get_announcements(course_id, since=since)
     return {"announcements": announcements}
 
 @app.get("/api/assignments")
-def fetch_assignments():
-    assignments = get_assignments()
+def fetch_assignments(course_id: str, due_after: Optional[str] = None, due_before: Optional[str] = None):
+    ensure_synced("assignments", course_id)
+    assignments = canvas_store.get_assignments(course_id, due_after=due_after, due_before=due_before)
     return {"assignments": assignments}
 
+@app.get("/api/cache-stats")
+def fetch_cache_stats():
+    return {"courses": canvas_cache.stats(), "sync": sync_engine.cache.stats()}
+
 @app.get("/api/schedule")
-async def get_schedule():
+def get_schedule(request: Request):
     try:
-        # Get the absolute path to the schedule file
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        schedule_path = os.path.join(current_dir, "backend_schedules", "study_schedule_1739093364.js")
-        
-        logger.info(f"Attempting to read schedule from: {schedule_path}")
-        
-        # Check if file exists
-        if not os.path.exists(schedule_path):
-            logger.error(f"Schedule file not found at: {schedule_path}")
-            raise FileNotFoundError(f"Schedule file not found at: {schedule_path}")
-        
-        # Read the JS file and convert to JSON
-        with open(schedule_path, "r") as file:
-            content = file.read()
-            # Remove "module.exports = " and the trailing semicolon
-            json_str = content.replace("module.exports = ", "").rstrip(";")
-            schedule_data = json.loads(json_str)
-            logger.info("Successfully loaded schedule data")
-            return schedule_data
-            
-    except FileNotFoundError as e:
-        logger.error(f"File not found error: {str(e)}")
-        raise HTTPException(status_code=404, detail=str(e))
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error parsing schedule data: {str(e)}")
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        latest = schedule_registry.latest()
+    except OSError as e:
+        logger.error(f"Could not read schedules: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    if latest is None:
+        raise HTTPException(status_code=404, detail=f"No schedule found in {schedule_registry.directory}")
+
+    _, body, etag, _ = latest
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/api/schedule-stats")
+def fetch_schedule_stats():
+    return schedule_registry.stats()
 
 @app.get("/api/select-course/{course_id}")
 def choose_course(course_id: str):
     result = select_course(course_id)
     return {"selected_course": result}
 
+def get_pipeline():
+    """
+    Imports the analysis pipeline on first use.
+
+    analyze_screenshots pulls in torch, transformers, torchvision and langchain,
+    which none of the Canvas routes need, so it stays out of main's import path.
+    """
+    import analyze_screenshots
+    return analyze_screenshots
+
+def analyze_session(session, cancel_event=None, trace=False):
+    """
+    Capture a screenshot and run the analysis pipeline for a session's study topic.
+    With trace, the result is {"analysis": ..., "trace": per-stage timings and counters}.
+    """
+    pipeline = get_pipeline()
+    pipeline_trace = pipeline.PipelineTrace()
+
+    # Definition for the session's topic, built once per topic
+    definition = session.definition(pipeline.create_definition)
+
+    # Get new screenshot and analyze it
+    with pipeline_trace.stage("capture"):
+        screenshot = pipeline.get_latest_screenshot()
+    if screenshot is None:
+        raise RuntimeError("Failed to capture screenshot")
+    result = pipeline.run_pipeline(screenshot, definition, cancel_event=cancel_event,
+                                   detector=session.change_detector, trace=pipeline_trace)
+    if trace:
+        return {"analysis": result, "trace": pipeline_trace.to_dict()}
+    return result
+
+@app.post("/api/sessions")
+def create_session(topic: StudyTopic):
+    session = sessions.create(topic.text)
+    return session.to_dict()
+
+@app.get("/api/sessions/{session_id}")
+def get_session(session_id: str):
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {**session.to_dict(), "jobs": job_manager.stats()["sessions"].get(session_id)}
+
+@app.delete("/api/sessions/{session_id}")
+def delete_session(session_id: str):
+    if sessions.remove(session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    cancelled = job_manager.remove_session(session_id)
+    return {"status": "success", "session_id": session_id, "cancelled_jobs": cancelled}
+
 @app.post("/api/submit")
 async def submit_topic(topic: StudyTopic):
-    global is_analysis_running
+    logger.info(f"Received study topic: {topic.text}")
+    # Requests without a session id share the default session
+    session = sessions.get_or_create(topic.session_id or DEFAULT_SESSION, topic.text)
     try:
-        if is_analysis_running:
-            raise HTTPException(status_code=400, detail="Analysis already in progress")
-            
-        is_analysis_running = True
-        logger.info(f"Received study topic: {topic.text}")
-        
-        # Create definition using the submitted topic
-        definition = create_definition(topic.text)
-        
-        # Get new screenshot and analyze it
-        image_path = get_latest_screenshot()
-        if image_path:
-            # Run the pipeline with the new topic
-            analysis_result = run_pipeline(image_path, definition)
-            return {
-                "status": "success",
-                "message": "Analysis completed",
-                "result": analysis_result
-            }
-        else:
-            raise HTTPException(status_code=500, detail="Failed to capture screenshot")
-            
-    except Exception as e:
-        logger.error(f"Error processing study topic: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        is_analysis_running = False
+        job = job_manager.submit_to(session.id, analyze_session, session, trace=topic.trace)
+    except SessionQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {
+        "status": "queued",
+        "message": "Analysis queued",
+        "job_id": job.id,
+        "session_id": session.id
+    }
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/api/pipeline-stats")
+def fetch_pipeline_stats():
+    stats = {"queue_depth": job_manager.queue_depth(), "jobs": job_manager.stats(),
+             "sessions": len(sessions), "pipeline_loaded": False}
+    # Don't import the ML stack just to report that it hasn't been used yet
+    if "analyze_screenshots" in sys.modules:
+        pipeline = get_pipeline()
+        stats.update({
+            "pipeline_loaded": True,
+            "change_detector": pipeline.change_detector.stats(),
+            "ocr_cache": pipeline.ocr_cache.stats(),
+            "classifier": pipeline.verdict_classifier.stats(),
+            "model": pipeline.model_manager.stats(),
+            "stages": pipeline.pipeline_metrics.stats()
+        })
+        if pipeline.INFERENCE_WORKERS > 0:
+            stats["inference_workers"] = pipeline.get_worker_pool().stats()
+    return stats
+
+def gauge(name, help_text, value, labels=None):
+    return (name, "gauge", help_text, [(labels or {}, value)])
+
+@app.get("/api/metrics")
+def fetch_metrics():
+    """Pipeline, queue and model metrics in the Prometheus text format."""
+    jobs = job_manager.stats()
+    families = [
+        gauge("jobs_queued", "Analysis jobs waiting in the queue.", jobs["queue_depth"]),
+        gauge("jobs_running", "Analysis jobs currently running.", jobs["running"]),
+        gauge("jobs_oldest_wait_seconds", "Age of the oldest queued analysis job.", jobs["oldest_wait_seconds"]),
+        gauge("jobs_throughput_per_minute", "Analyses finished per minute, recent window.", jobs["throughput_per_minute"]),
+        gauge("sessions", "Open analysis sessions.", len(sessions)),
+        gauge("pipeline_loaded", "Whether the analysis pipeline has been imported.", "analyze_screenshots" in sys.modules),
+    ]
+    # Don't import the ML stack just to report that it hasn't been used yet
+    if "analyze_screenshots" in sys.modules:
+        pipeline = get_pipeline()
+        model = pipeline.model_manager.stats()
+        ocr = pipeline.ocr_cache.stats()
+        families += pipeline.pipeline_metrics.families()
+        families += [
+            gauge("model_loaded", "Whether InternVL is loaded in the API process.", model["loaded"]),
+            gauge("model_resident_bytes", "Bytes held by the loaded model's parameters and buffers.", model["resident_bytes"]),
+            gauge("model_last_load_seconds", "Duration of the last model load.", model["last_load_seconds"]),
+            ("model_loads_total", "counter", "Model loads since startup.", [({}, model["load_count"])]),
+            gauge("gpu_memory_allocated_bytes", "GPU memory allocated by torch.", model["gpu_memory_allocated_gb"] * 1e9),
+            gauge("gpu_memory_total_bytes", "Total memory of GPU 0.", model["gpu_memory_total_gb"] * 1e9),
+            gauge("ocr_cache_hit_ratio", "Share of OCR lookups answered from the cache.", ocr["hit_rate"]),
+            gauge("ocr_cache_memory_bytes", "Bytes of OCR results cached in memory.", ocr["memory_bytes"]),
+        ]
+        info = model["info"]
+        if info and "error" not in info:
+            families.append(gauge("model_info", "Loaded model; the value is always 1.", 1,
+                                  {key: info[key] for key in ("model_type", "device", "dtype") if key in info}))
+            families.append(gauge("model_parameters", "Parameter count of the loaded model.", info["parameters"]))
+        if pipeline.INFERENCE_WORKERS > 0:
+            workers = pipeline.get_worker_pool().stats()
+            families += [
+                gauge("inference_workers_ready", "Inference worker processes ready for jobs.", workers["ready"]),
+                gauge("inference_workers_busy", "Inference worker processes running a job.", workers["busy"]),
+                gauge("inference_queue_depth", "Generations waiting for a worker process.", workers["queued"]),
+                ("inference_worker_restarts_total", "counter", "Inference worker processes restarted.",
+                 [({}, workers["restarts"])]),
+            ]
+    return Response(content=render_prometheus(families), media_type="text/plain; version=0.0.4")
 
 @app.post("/api/cancel")
-async def cancel_analysis():
-    global is_analysis_running
-    try:
-        if not is_analysis_running:
+async def cancel_analysis(job_id: Optional[str] = None, session_id: Optional[str] = None):
+    # Without a job id, cancel whatever is running right now (for the session, if given)
+    if job_id is None:
+        current = job_manager.current(session_id)
+        if current is None:
             return {"status": "success", "message": "No analysis running"}
-            
-        # Set the flag to false to stop the analysis
-        is_analysis_running = False
-        
-        # Cleanup resources
-        cleanup_model(internvl_model)
-        logger.info("Analysis canceled and resources cleaned up")
-        
-        return {
-            "status": "success",
-            "message": "Analysis canceled successfully"
-        }
-    except Exception as e:
-        logger.error(f"Error canceling analysis: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        job_id = current.id
+
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "status": "success",
+        "message": "Cancellation requested",
+        "job_id": job_id
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_FILE = re.compile(r"^study_schedule_(\d+)\.(json|js)$")
+# Hour keys the frontend calendars render, e.g. "09:00 am"
+HOUR_KEY = re.compile(r"^\d{2}:\d{2} (am|pm)$")
+JS_PREFIX = "module.exports = "
+
+
+def parse_schedule_file(path):
+    """Read a schedule written as plain JSON or as a ``module.exports = {...};`` JS module."""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    if path.endswith(".js"):
+        content = content.strip()
+        if content.startswith(JS_PREFIX):
+            content = content[len(JS_PREFIX):]
+        content = content.rstrip(";")
+    return json.loads(content)
+
+
+def is_valid_schedule(data):
+    schedule = data.get("schedule") if isinstance(data, dict) else None
+    return isinstance(schedule, dict) and bool(schedule) and all(HOUR_KEY.match(key) for key in schedule)
+
+
+def write_schedule(directory, schedule, timestamp):
+    """
+    Write ``schedule`` as study_schedule_<timestamp>.json plus the JS module
+    export, each via write-then-rename so readers never see a partial file.
+
+    :return: Path of the JSON file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    body = json.dumps(schedule, indent=2)
+    base = os.path.join(directory, f"study_schedule_{timestamp}")
+    # JSON last: its appearance is what makes the registry pick the schedule up
+    for path, content in ((f"{base}.js", f"{JS_PREFIX}{body};"), (f"{base}.json", body)):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return f"{base}.json"
+
+
+class ScheduleRegistry:
+    """
+    Index of generated schedules in ``backend_schedules/``.
+
+    The latest valid schedule is kept parsed and pre-serialized in memory with
+    an ETag. Each lookup only stats the directory and the current file; the
+    index is rebuilt when the directory changes (a schedule was added or
+    removed) and the file is re-read when its mtime or size changes.
+    """
+
+    def __init__(self, directory="backend_schedules"):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._dir_stamp = None
+        self._candidates = []
+        self._current = None  # (path, file stamp, data, body, etag)
+        self._rejected = {}  # path -> file stamp, so bad files aren't re-parsed on every request
+        self.loads = 0
+
+    def _index(self):
+        """Schedule files newest first; a .json file wins over the .js export of the same schedule."""
+        found = {}
+        for name in os.listdir(self.directory):
+            match = SCHEDULE_FILE.match(name)
+            if match:
+                timestamp, extension = int(match.group(1)), match.group(2)
+                if extension == "json" or timestamp not in found:
+                    found[timestamp] = os.path.join(self.directory, name)
+        return [found[timestamp] for timestamp in sorted(found, reverse=True)]
+
+    @staticmethod
+    def _stamp(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_latest(self):
+        for path in self._candidates:
+            try:
+                stamp = self._stamp(path)
+                if self._current and self._current[0] == path and self._current[1] == stamp:
+                    return
+                if self._rejected.get(path) == stamp:
+                    continue
+                data = parse_schedule_file(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable schedule {path}: {e}")
+                continue
+            if not is_valid_schedule(data):
+                logger.warning(f"Skipping schedule {path}: unexpected format")
+                self._rejected[path] = stamp
+                continue
+            body = json.dumps(data).encode("utf-8")
+            etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            self._current = (path, stamp, data, body, etag)
+            self.loads += 1
+            logger.info(f"Loaded schedule {path}")
+            return
+        self._current = None
+
+    def refresh(self):
+        """Pick up added, removed or rewritten schedule files."""
+        with self._lock:
+            try:
+                dir_stamp = self._stamp(self.directory)
+            except FileNotFoundError:
+                self._dir_stamp, self._candidates, self._current = None, [], None
+                return
+            if dir_stamp != self._dir_stamp:
+                self._dir_stamp = dir_stamp
+                self._candidates = self._index()
+            self._load_latest()
+
+    def latest(self):
+        """
+        :return: (data, serialized JSON bytes, etag, path) of the newest valid schedule, or None.
+        """
+        self.refresh()
+        current = self._current
+        if current is None:
+            return None
+        path, _, data, body, etag = current
+        return data, body, etag, path
+
+    def stats(self):
+        current = self._current
+        return {
+            "path": current[0] if current else None,
+            "etag": current[4] if current else None,
+            "indexed": len(self._candidates),
+            "loads": self.loads,
+        }
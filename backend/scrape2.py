@@ -1,7 +1,8 @@
 import sys
 import json
-import requests
 from config import API_KEY
+from canvas_client import CanvasClient, CanvasError
+from canvas_cache import CanvasCache
 
 print("Python Executable:", sys.executable)
 
@@ -9,10 +10,8 @@ print("Python Executable:", sys.executable)
 API_URL = "https://learn.ontariotechu.ca/api/v1"
 API_TOKEN = API_KEY  # Insert API token
 
-headers = {
-    "Authorization": f"Bearer {API_TOKEN}",
-    "Accept": "application/json"
-}
+# Shared client: keeps connections alive between calls and follows pagination
+client = CanvasClient(API_URL, API_TOKEN)
 
 # Function to save data as JSON
 def save_to_json(filename, data):
@@ -23,20 +22,19 @@ def save_to_json(filename, data):
     except Exception as e:
         print(f"Error saving to {filename}: {e}")
 
+# In-memory cache used by the API; files are only rewritten when Canvas data changes
+cache = CanvasCache(client, on_change=lambda resource, data: save_to_json(f"{resource}.json", data))
+
 # Fetch the list of courses for the authenticated user
-def get_courses():
-    response = requests.get(f"{API_URL}/courses", headers=headers)
-    
-    if response.status_code == 200:
-        try:
-            courses = response.json()
-            save_to_json("courses.json", courses)
-            return courses
-        except requests.exceptions.JSONDecodeError:
-            print("Error: Received invalid JSON response.")
-            return None
-    else:
-        print(f"Failed to fetch courses (HTTP {response.status_code})")
+def get_courses(cached=False):
+    try:
+        if cached:
+            return cache.get("courses", "courses")
+        courses = client.get_all("courses")
+        save_to_json("courses.json", courses)
+        return courses
+    except CanvasError as e:
+        print(f"Failed to fetch courses: {e}")
         return None
 
 # Let the user select a course by name
@@ -63,57 +61,37 @@ def select_course(courses):
 
 # Fetch grades for the authenticated user in the selected course
 def get_grades(course_id):
-    response = requests.get(f"{API_URL}/courses/{course_id}/students/submissions", headers=headers)
-    
-    if response.status_code == 200:
-        try:
-            grades = response.json()
-            save_to_json("grades.json", grades)
-            return grades
-        except requests.exceptions.JSONDecodeError:
-            print("Error: Received invalid JSON response.")
-            return None
-    else:
-        print(f"Failed to fetch grades (HTTP {response.status_code})")
+    try:
+        grades = client.get_all(f"courses/{course_id}/students/submissions")
+        save_to_json("grades.json", grades)
+        return grades
+    except CanvasError as e:
+        print(f"Failed to fetch grades: {e}")
         return None
 
 # Fetch announcements for the selected course
-def get_announcements(course_id):
-    response = requests.get(
-        f"{API_URL}/announcements", 
-        headers=headers, 
-        params={"context_codes[]": f"course_{course_id}"}
-    )
-    
-    if response.status_code == 200:
-        try:
-            announcements = response.json()
-            save_to_json("announcements.json", announcements)
-            return announcements
-        except requests.exceptions.JSONDecodeError:
-            print("Error: Received invalid JSON response.")
-            return None
-    else:
-        print(f"Failed to fetch announcements (HTTP {response.status_code})")
+def get_announcements(course_id, cached=False):
+    try:
+        params = {"context_codes[]": f"course_{course_id}"}
+        if cached:
+            return cache.get("announcements", "announcements", params)
+        announcements = client.get_all("announcements", params=params)
+        save_to_json("announcements.json", announcements)
+        return announcements
+    except CanvasError as e:
+        print(f"Failed to fetch announcements: {e}")
         return None
 
 # Fetch assignments for the selected course
-def get_assignments(course_id):
-    response = requests.get(
-        f"{API_URL}/courses/{course_id}/assignments", 
-        headers=headers
-    )
-    
-    if response.status_code == 200:
-        try:
-            assignments = response.json()
-            save_to_json("assignments.json", assignments)
-            return assignments
-        except requests.exceptions.JSONDecodeError:
-            print("Error: Received invalid JSON response.")
-            return None
-    else:
-        print(f"Failed to fetch assignments (HTTP {response.status_code})")
+def get_assignments(course_id, cached=False):
+    try:
+        if cached:
+            return cache.get("assignments", f"courses/{course_id}/assignments")
+        assignments = client.get_all(f"courses/{course_id}/assignments")
+        save_to_json("assignments.json", assignments)
+        return assignments
+    except CanvasError as e:
+        print(f"Failed to fetch assignments: {e}")
         return None
 
 # Main workflow
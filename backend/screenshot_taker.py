@@ -1,15 +1,155 @@
 import os
+import queue
+import logging
+import threading
 from PIL import ImageGrab
 from datetime import datetime
+from utils.window_geometry import ActiveWindowProvider, StaticGeometryProvider, clip_bbox, parse_region
+
+logger = logging.getLogger(__name__)
+
+SCREENSHOT_DIR = 'backend/screenshots'
+# Format/quality for the optional on-disk copy ("jpeg", "webp" or lossless "png").
+# JPEG encodes a 2560x1600 frame several times faster than WebP, leaving the CPU to the model
+SCREENSHOT_FORMAT = os.environ.get("SCREENSHOT_FORMAT", "jpeg")
+SCREENSHOT_QUALITY = int(os.environ.get("SCREENSHOT_QUALITY", "85"))
+PERSIST_SCREENSHOTS = os.environ.get("PERSIST_SCREENSHOTS", "1") != "0"
+# What to capture: the "full" screen (default), or opt in to the focused "window"
+# or a fixed "region" (CAPTURE_REGION="left,top,right,bottom"). Cropping cuts the
+# InternVL tile count, but can hide a distracting window elsewhere on screen.
+CAPTURE_MODE = os.environ.get("CAPTURE_MODE", "full")
+CAPTURE_REGION = parse_region(os.environ.get("CAPTURE_REGION", ""))
+
+class ScreenshotWriter:
+    """
+    Saves screenshots on a background thread so compression never delays analysis.
+
+    The queue is bounded; if the disk can't keep up, the oldest pending frame is
+    dropped rather than blocking the capture loop.
+    """
+
+    def __init__(self, directory=SCREENSHOT_DIR, image_format=SCREENSHOT_FORMAT,
+                 quality=SCREENSHOT_QUALITY, max_pending=4):
+        self.directory = directory
+        self.image_format = image_format.lower()
+        self.quality = quality
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.saved = 0
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            image, path = self.queue.get()
+            try:
+                self.write(image, path)
+            except Exception as e:
+                logger.error(f"Could not save screenshot {path}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def write(self, image, path):
+        options = {}
+        if self.image_format == "jpeg":
+            options["quality"] = self.quality
+        elif self.image_format == "webp":
+            options.update(quality=self.quality, method=0)
+        elif self.image_format == "png":
+            options["compress_level"] = 1
+        # Write-then-rename so readers never see a half-written file
+        tmp_path = f"{path}.tmp"
+        image.save(tmp_path, format=self.image_format.upper(), **options)
+        os.replace(tmp_path, path)
+        self.saved += 1
+
+    def submit(self, image, timestamp=None):
+        """
+        Queue ``image`` for saving and return the path it will be written to.
+        The image must not be modified afterwards.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = timestamp or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        extension = "jpg" if self.image_format == "jpeg" else self.image_format
+        path = os.path.join(self.directory, f"screenshot_{timestamp}.{extension}")
+        self._ensure_thread()
+        while True:
+            try:
+                self.queue.put_nowait((image, path))
+                return path
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def flush(self):
+        """Block until every queued screenshot has been written."""
+        self.queue.join()
+
+screenshot_writer = ScreenshotWriter()
+
+_geometry_providers = {}
+
+def get_geometry_provider(mode):
+    """Window geometry source for a capture mode (None for full-screen)."""
+    if mode == "full":
+        return None
+    if mode not in _geometry_providers:
+        if mode == "window":
+            _geometry_providers[mode] = ActiveWindowProvider()
+        elif mode == "region":
+            _geometry_providers[mode] = StaticGeometryProvider(CAPTURE_REGION)
+        else:
+            raise ValueError(f"Unknown capture mode: {mode}")
+    return _geometry_providers[mode]
+
+def crop_to_geometry(screenshot, geometry):
+    """
+    Crop a full-screen image to the provider's window/region. Falls back to the
+    full screen when there is no usable geometry.
+    """
+    if geometry is None:
+        return screenshot
+    bbox = clip_bbox(geometry.active_window_bbox(), screenshot.size)
+    return screenshot.crop(bbox) if bbox else screenshot
+
+def grab_screen(geometry=None):
+    """Capture the screen, optionally cropped to ``geometry``, as an in-memory RGB PIL image."""
+    screenshot = ImageGrab.grab()
+    screenshot = screenshot if screenshot.mode == 'RGB' else screenshot.convert('RGB')
+    return crop_to_geometry(screenshot, geometry)
+
+def capture_frame(persist=PERSIST_SCREENSHOTS, mode=CAPTURE_MODE, geometry=None):
+    """
+    Capture the screen for analysis without a disk round trip.
+
+    :param persist: Also save a copy in the background (SCREENSHOT_FORMAT/SCREENSHOT_QUALITY).
+    :param mode: "full", "window" or "region" (see CAPTURE_MODE).
+    :param geometry: Geometry provider overriding the one for ``mode``, e.g. a
+        StaticGeometryProvider standing in for the focused window when headless.
+    :return: (PIL image, path the copy is being written to or None)
+    """
+    screenshot = grab_screen(geometry or get_geometry_provider(mode))
+    path = screenshot_writer.submit(screenshot) if persist else None
+    return screenshot, path
 
 def capture_screenshot():
     # Ensure 'screenshots' folder exists
-    if not os.path.exists('backend/screenshots'):
-        os.makedirs('backend/screenshots')
+    if not os.path.exists(SCREENSHOT_DIR):
+        os.makedirs(SCREENSHOT_DIR)
 
     # Generate a unique filename based on timestamp
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"backend/screenshots/screenshot_{timestamp}.png"
+    filename = f"{SCREENSHOT_DIR}/screenshot_{timestamp}.png"
 
     # Capture the screenshot and save it
     screenshot = ImageGrab.grab()
@@ -17,4 +157,4 @@ def capture_screenshot():
     print(f"Screenshot saved as {filename}")
 
 
-    return filename
\ No newline at end of file
+    return filename
@@ -0,0 +1,77 @@
+"""
+AnalysisStore legacy imports and justification sampling on a temporary database.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from analysis_store import AnalysisStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AnalysisStore(str(tmp_path / "analyses.db"))
+    yield store
+    store.close()
+
+
+def analysis(timestamp, verdict, justification="Reading notes."):
+    return {"Timestamp": timestamp, "Content": "A screenshot.",
+            "Justification": justification, "Verdict": verdict}
+
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def test_imports_lists_and_single_objects_once(store, tmp_path):
+    directory = tmp_path / "analyses"
+    directory.mkdir()
+    write_json(directory / "analysis_1.json", [analysis("2025-02-08 10:00:00", False),
+                                               analysis("2025-02-08 10:01:00", True)])
+    # Older runs wrote one analysis object per file
+    write_json(directory / "analysis_2.json", analysis("2025-02-08 10:02:00", False))
+
+    assert store.import_directory(str(directory)) == 3
+    assert [a["Timestamp"] for a in store.range()] == [
+        "2025-02-08 10:00:00", "2025-02-08 10:01:00", "2025-02-08 10:02:00"]
+    assert store.import_directory(str(directory)) == 0
+    assert store.count() == 3
+
+
+def test_unparseable_files_are_retried(store, tmp_path):
+    directory = tmp_path / "analyses"
+    directory.mkdir()
+    (directory / "analysis_1.json").write_text("[{")
+
+    assert store.import_directory(str(directory)) == 0
+    write_json(directory / "analysis_1.json", [analysis("2025-02-08 10:00:00", True)])
+    assert store.import_directory(str(directory)) == 1
+
+
+def test_latest_justifications_are_distinct_and_interleaved(store):
+    store.append([analysis("2025-02-08 09:00:00", True, "Old notes.")]
+                 + [analysis(f"2025-02-08 10:{minute:02d}:00", True, "Reading notes.") for minute in range(10)]
+                 + [analysis(f"2025-02-08 11:{minute:02d}:00", False, "Watching videos.") for minute in range(10)]
+                 + [analysis("2025-02-08 11:30:00", False, "  "),
+                    analysis("2025-02-08 11:31:00", False, "Scrolling social media.")])
+
+    assert store.latest_justifications(6) == [
+        (False, "Scrolling social media."), (True, "Reading notes."),
+        (False, "Watching videos."), (True, "Old notes."),
+    ]
+    assert store.latest_justifications(3) == [
+        (False, "Scrolling social media."), (True, "Reading notes."), (False, "Watching videos."),
+    ]
+    # The range applies before grouping: a duplicate's later rows don't pull it out of range
+    assert store.latest_justifications(6, end="2025-02-08 10:05:00") == [
+        (True, "Reading notes."), (True, "Old notes."),
+    ]
@@ -0,0 +1,90 @@
+"""
+CanvasClient pagination against the local fake Canvas server.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_canvas import start_fake_canvas
+from canvas_client import CanvasClient
+
+PATH = "courses/1/assignments"
+
+
+@pytest.fixture
+def canvas():
+    servers = []
+
+    def start(**kwargs):
+        server = start_fake_canvas(**kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def expected_items(total):
+    return [{"id": n, "name": f"Item {n}"} for n in range(total)]
+
+
+def page_values(server):
+    return [query.get("page", "1") for _, query in server.requests]
+
+
+def test_follows_next_links_sequentially(canvas):
+    server = canvas(total=250)
+    client = CanvasClient(server.url, "token", per_page=100, max_workers=1)
+
+    assert client.get_all(PATH) == expected_items(250)
+    assert page_values(server) == ["1", "2", "3"]
+
+
+def test_fetches_numbered_pages_concurrently_up_to_last(canvas):
+    server = canvas(total=250)
+    client = CanvasClient(server.url, "token", per_page=25, max_workers=4)
+
+    items = client.get_all(PATH)
+
+    # Concurrent pages may arrive in any order, but the result keeps page order
+    assert items == expected_items(250)
+    assert sorted(page_values(server), key=int) == [str(n) for n in range(1, 11)]
+    assert all(query["per_page"] == "25" for _, query in server.requests)
+
+
+def test_follows_bookmark_links(canvas):
+    server = canvas(total=130, bookmarks=True)
+    client = CanvasClient(server.url, "token", per_page=50, max_workers=4)
+
+    assert client.get_all(PATH) == expected_items(130)
+    pages = page_values(server)
+    assert len(pages) == 3
+    assert all(page.startswith("bookmark:") for page in pages[1:])
+
+
+def test_per_page_is_sent_and_capped(canvas):
+    server = canvas(total=120)
+    client = CanvasClient(server.url, "token", per_page=500, max_workers=1)
+
+    assert client.per_page == 100
+    assert client.get_all(PATH, params={"include[]": "submission"}) == expected_items(120)
+    first_path, first_query = server.requests[0]
+    assert first_path == f"/api/v1/{PATH}"
+    assert first_query["per_page"] == "100"
+    assert first_query["include[]"] == "submission"
+
+
+def test_single_page_collection(canvas):
+    server = canvas(total=7)
+    client = CanvasClient(server.url, "token")
+
+    assert client.get_all(PATH) == expected_items(7)
+    assert len(server.requests) == 1
@@ -0,0 +1,99 @@
+"""
+OllamaStreamingClient field parsing and early stop against the local fake Ollama server.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_ollama import RAMBLE, VERDICT, start_fake_ollama, tokenize
+from utils.ollama_client import OllamaStreamError, OllamaStreamingClient, StreamingJsonFields
+
+PROMPT = "Analyze the following screenshot description:\nA PDF of lecture notes.\n\nJSON Response:"
+EXPECTED = {"label": "productive",
+            "reasoning": "The screenshot shows course notes related to the study topic."}
+
+
+@pytest.fixture
+def ollama():
+    servers = []
+
+    def start(**kwargs):
+        server = start_fake_ollama(**kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_fields_split_across_chunks():
+    # One character per chunk: every key, quote and escape arrives separately
+    parser = StreamingJsonFields(("label", "reasoning"))
+    text = '{"label": "procrastination", "reasoning": "Watching \\"shorts\\" on YouTube."}'
+    done_at = None
+    for index, char in enumerate(text):
+        if parser.feed(char):
+            done_at = index
+            break
+    assert done_at == text.rindex('"')
+    assert parser.values == {"label": "procrastination", "reasoning": 'Watching "shorts" on YouTube.'}
+
+
+def test_streams_fields_from_token_chunks(ollama):
+    server = ollama(token_delay=0.0)
+    client = OllamaStreamingClient(base_url=server.url)
+
+    # The fake server splits at quotes, colons and spaces, so keys and values span chunks
+    assert len(tokenize(VERDICT)) > 10
+    assert client.generate_fields(PROMPT) == EXPECTED
+
+
+def test_stops_once_both_fields_are_parsed(ollama):
+    token_delay = 0.01
+    server = ollama(token_delay=token_delay)
+    client = OllamaStreamingClient(base_url=server.url)
+
+    start = time.perf_counter()
+    assert client.generate_fields(PROMPT, max_tokens=None) == EXPECTED
+    elapsed = time.perf_counter() - start
+
+    full_stream = len(tokenize(VERDICT + RAMBLE)) * token_delay
+    assert elapsed < full_stream / 2
+    # The server notices the closed connection on its next write
+    deadline = time.monotonic() + 5
+    while server.aborted == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert server.aborted == 1
+    assert server.completed == 0
+
+
+def test_missing_field_raises(ollama):
+    server = ollama(token_delay=0.0, completion='{"label": "productive"} and nothing else')
+    client = OllamaStreamingClient(base_url=server.url)
+
+    with pytest.raises(OllamaStreamError, match="missing fields"):
+        client.generate_fields(PROMPT)
+
+
+def test_server_error_raises(ollama):
+    server = ollama(error_status=500)
+    client = OllamaStreamingClient(base_url=server.url)
+
+    with pytest.raises(OllamaStreamError, match="HTTP 500"):
+        client.generate_fields(PROMPT)
+
+
+def test_unreachable_server_raises():
+    client = OllamaStreamingClient(base_url="http://127.0.0.1:9", connect_timeout=0.5)
+
+    with pytest.raises(OllamaStreamError, match="request failed"):
+        client.generate_fields(PROMPT)
@@ -0,0 +1,162 @@
+import datetime
+import hashlib
+import logging
+import os
+from typing import Iterable, Optional, Tuple
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+PRODID = "-//literal-academic-weapon//study schedule//EN"
+UID_DOMAIN = "literal-academic-weapon"
+
+
+def escape_text(value: str) -> str:
+    """Escape a TEXT property value (RFC 5545 3.3.11)."""
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold(line: str) -> str:
+    """Fold a content line at 75 octets without splitting UTF-8 sequences."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # Don't cut inside a multi-byte character (continuation bytes are 10xxxxxx)
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        start, limit = end, 74  # continuation lines start with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def event_uid(date: str, time: str) -> str:
+    """Stable UID for a study slot, so re-exports update events instead of duplicating them."""
+    digest = hashlib.blake2b(f"{date} {time}".encode("utf-8"), digest_size=12).hexdigest()
+    return f"{digest}@{UID_DOMAIN}"
+
+
+def read_events(filename: str) -> dict:
+    """
+    Stream a previously written ICS file and return {uid: (fingerprint, sequence, raw text)}.
+    The raw text is the event exactly as written, so it can be copied through unchanged.
+    Only the fields this writer emits are understood.
+    """
+    events = {}
+    if not os.path.exists(filename):
+        return events
+
+    def logical_lines(f):
+        """Unfolded lines, each with the physical text it came from."""
+        pending, raw_text = None, ""
+        for raw in f:
+            line = raw.rstrip("\r\n")
+            if line.startswith((" ", "\t")) and pending is not None:
+                pending += line[1:]
+                raw_text += raw
+                continue
+            if pending is not None:
+                yield pending, raw_text
+            pending, raw_text = line, raw
+        if pending is not None:
+            yield pending, raw_text
+
+    with open(filename, "r", encoding="utf-8", newline="") as f:
+        current = None
+        for line, raw in logical_lines(f):
+            if line == "BEGIN:VEVENT":
+                current = {"raw": [raw]}
+            elif current is not None:
+                current["raw"].append(raw)
+                name, _, value = line.partition(":")
+                if name == "UID":
+                    current["uid"] = value
+                elif name == "SEQUENCE":
+                    current["sequence"] = int(value or 0)
+                elif name == "X-FINGERPRINT":
+                    current["fingerprint"] = value
+                elif line == "END:VEVENT":
+                    if "uid" in current:
+                        events[current["uid"]] = (current.get("fingerprint"), current.get("sequence", 0),
+                                                  "".join(current["raw"]))
+                    current = None
+    return events
+
+
+class ICSWriter:
+    """
+    Writes study slots to an .ics file one VEVENT at a time.
+
+    Events get deterministic UIDs from their date and slot. In incremental mode
+    the previous file is read first: events whose content is unchanged are
+    copied through verbatim (same DTSTAMP and SEQUENCE), changed ones get a new
+    DTSTAMP and SEQUENCE + 1, so calendar clients only re-process what changed.
+    The file is written to a temporary path and renamed into place.
+    """
+
+    def __init__(self, timezone: str = "America/Toronto", duration_minutes: int = 30,
+                 time_format: str = "%Y-%m-%d %I:%M %p"):
+        self.timezone = pytz.timezone(timezone)
+        self.duration = datetime.timedelta(minutes=duration_minutes)
+        self.time_format = time_format
+
+    def _event_lines(self, date: str, time: str, task: str):
+        start = datetime.datetime.strptime(f"{date} {time}", self.time_format)
+        end = start + self.duration
+        tzid = self.timezone.zone
+        return [
+            f"DTSTART;TZID={tzid}:{start:%Y%m%dT%H%M%S}",
+            f"DTEND;TZID={tzid}:{end:%Y%m%dT%H%M%S}",
+            f"SUMMARY:{escape_text(task)}",
+        ]
+
+    def write(self, events: Iterable[Tuple[str, str, str]], filename: str,
+              incremental: bool = False, previous: Optional[dict] = None) -> dict:
+        """
+        :param events: (date "YYYY-MM-DD", time e.g. "10:00 AM", task) tuples, consumed lazily.
+        :param filename: Output .ics path.
+        :param incremental: Reuse unchanged events from the existing file and bump SEQUENCE on changed ones.
+        :param previous: Already parsed read_events() result, to skip re-reading the file.
+        :return: Counts of added, changed, unchanged and removed events.
+        """
+        if incremental and previous is None:
+            previous = read_events(filename)
+        previous = previous or {}
+        dtstamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        counts = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        seen = set()
+
+        tmp_path = f"{filename}.tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as out:
+            out.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n" + fold(f"PRODID:{PRODID}"))
+            for date, time, task in events:
+                uid = event_uid(date, time)
+                if uid in seen:
+                    continue  # A slot can only hold one event
+                seen.add(uid)
+                body = self._event_lines(date, time, task)
+                fingerprint = hashlib.blake2b("\n".join(body).encode("utf-8"), digest_size=8).hexdigest()
+
+                old = previous.get(uid)
+                if old is not None and old[0] == fingerprint:
+                    counts["unchanged"] += 1
+                    out.write(old[2])
+                    continue
+                if old is None:
+                    counts["added"] += 1
+                    sequence = 0
+                else:
+                    counts["changed"] += 1
+                    sequence = old[1] + 1
+                lines = (["BEGIN:VEVENT", f"UID:{uid}", f"DTSTAMP:{dtstamp}", f"SEQUENCE:{sequence}"]
+                         + body + [f"X-FINGERPRINT:{fingerprint}", "END:VEVENT"])
+                out.writelines(fold(line) for line in lines)
+            out.write("END:VCALENDAR\r\n")
+        os.replace(tmp_path, filename)
+
+        counts["removed"] = len(previous.keys() - seen)
+        return counts
@@ -0,0 +1,394 @@
+import logging
+import math
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future, TimeoutError as FutureTimeout
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Shared-memory segments a worker keeps mapped between jobs
+MAX_ATTACHED_SEGMENTS = 8
+
+
+def _portable_config(generation_config: dict) -> dict:
+    """Generation options that can cross a process boundary (drops e.g. stopping criteria)."""
+    return {k: v for k, v in generation_config.items() if isinstance(v, (str, int, float, bool, type(None)))}
+
+
+def _worker_main(worker_id: int, num_threads: int, loader: Callable, requests, results) -> None:
+    """
+    Worker process: load the model once, then describe images handed over
+    through shared memory until a None request arrives.
+    """
+    from utils.internvl_loader import count_generated_tokens
+
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    model, tokenizer, _, device = loader()
+    results.put(("ready", worker_id, None, None))
+
+    # The API process recycles segments, so keep recent ones mapped
+    attached = OrderedDict()
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        job_id, shm_name, shape, dtype_name, prompt, generation_config = request
+        try:
+            shm = attached.pop(shm_name, None) or SharedMemory(name=shm_name)
+            attached[shm_name] = shm
+            while len(attached) > MAX_ATTACHED_SEGMENTS:
+                attached.popitem(last=False)[1].close()
+            pixel_values = torch.frombuffer(shm.buf, dtype=getattr(torch, dtype_name),
+                                            count=math.prod(shape)).view(shape)
+            try:
+                response = model.chat(tokenizer, pixel_values.to(device), prompt, dict(generation_config))
+            finally:
+                # The tensor views shm.buf; drop it so the segment can be closed later
+                del pixel_values
+            results.put(("done", worker_id, job_id, (response, count_generated_tokens(tokenizer, response))))
+        except Exception as e:
+            results.put(("error", worker_id, job_id, f"{type(e).__name__}: {e}"))
+
+
+class _SegmentPool:
+    """
+    Recycles shared-memory segments between jobs. Creating a fresh segment
+    per job costs an ftruncate, a new mapping and page faults on every page,
+    which is slower than the copy itself.
+    """
+
+    def __init__(self, max_free: int):
+        self.max_free = max_free
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self, size: int) -> SharedMemory:
+        with self._lock:
+            for index, segment in enumerate(self._free):
+                if segment.size >= size:
+                    return self._free.pop(index)
+        return SharedMemory(create=True, size=max(1, size))
+
+    def release(self, segment: SharedMemory) -> None:
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(segment)
+                return
+        self._destroy(segment)
+
+    @staticmethod
+    def _destroy(segment: SharedMemory) -> None:
+        try:
+            segment.close()
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            free, self._free = self._free, []
+        for segment in free:
+            self._destroy(segment)
+
+
+class _InferenceJob:
+    def __init__(self, pixel_values: torch.Tensor, prompt: str, generation_config: dict,
+                 segments: _SegmentPool):
+        self.id = uuid.uuid4().hex
+        tensor = pixel_values.detach().contiguous().cpu()
+        self.shape = tuple(tensor.shape)
+        self.dtype_name = str(tensor.dtype).replace("torch.", "")
+        self.segments = segments
+        self.shm = segments.acquire(tensor.numel() * tensor.element_size())
+        # numpy has no bfloat16; copy the raw 16-bit words instead
+        raw = tensor.view(torch.int16) if tensor.dtype in (torch.bfloat16, torch.float16) else tensor
+        torch.frombuffer(self.shm.buf, dtype=raw.dtype, count=raw.numel()).copy_(raw.reshape(-1))
+        self.prompt = prompt
+        self.generation_config = _portable_config(generation_config)
+        self.future = Future()
+        self.attempts = 0
+        self.submitted_at = time.monotonic()
+
+    def request(self):
+        return self.id, self.shm.name, self.shape, self.dtype_name, self.prompt, self.generation_config
+
+    def release(self):
+        if self.shm is not None:
+            self.segments.release(self.shm)
+            self.shm = None
+
+
+class _Worker:
+    def __init__(self, worker_id: int, process, requests):
+        self.id = worker_id
+        self.process = process
+        self.requests = requests
+        self.ready = False
+        self.job: Optional[_InferenceJob] = None
+
+
+class InferenceWorkerPool:
+    """
+    InternVL generation in separate worker processes.
+
+    Each of the ``num_workers`` processes loads its own model and is limited to
+    ``threads_per_worker`` torch threads, so CPU-only hosts can spread work over
+    their cores/sockets. Tiles are copied once into a shared-memory segment
+    that the worker reads in place instead of being pickled through a pipe.
+
+    A worker that dies (crash, OOM kill) is restarted. The job it was running
+    goes back to the front of the queue, up to ``max_retries`` times; queued
+    jobs are never dropped.
+    """
+
+    # A worker that dies this many times in a row before loading its model is not restarted again
+    MAX_FAILED_STARTS = 3
+
+    def __init__(self, num_workers: int = 2, threads_per_worker: Optional[int] = None,
+                 loader: Optional[Callable] = None, max_retries: int = 1, check_interval: float = 0.5):
+        """
+        :param num_workers: Number of model processes.
+        :param threads_per_worker: torch threads per process; defaults to an even split of the CPUs.
+        :param loader: Top-level function returning (model, tokenizer, processor, device),
+            called in each worker. Defaults to load_internvl_model.
+        :param max_retries: Times a job is re-run after its worker died.
+        :param check_interval: Seconds between worker liveness checks.
+        """
+        if loader is None:
+            from utils.internvl_loader import load_internvl_model
+            loader = load_internvl_model
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        self.loader = loader
+        self.max_retries = max_retries
+        self.check_interval = check_interval
+        self._ctx = mp.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._pending = deque()
+        self._segments = _SegmentPool(max_free=2 * num_workers)
+        self._workers = {}
+        self._failed_starts = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+
+        for worker_id in range(num_workers):
+            self._start_worker(worker_id)
+        self._collector = threading.Thread(target=self._collect, name="inference-collector", daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, worker_id: int) -> None:
+        requests = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main, name=f"internvl-worker-{worker_id}", daemon=True,
+            args=(worker_id, self.threads_per_worker, self.loader, requests, self._results)
+        )
+        process.start()
+        self._workers[worker_id] = _Worker(worker_id, process, requests)
+        logger.info(f"Started inference worker {worker_id} (pid {process.pid}, {self.threads_per_worker} threads)")
+
+    def submit(self, pixel_values: torch.Tensor, prompt: str, generation_config: dict) -> Future:
+        """
+        Queue a generation; the returned future resolves to the model's response.
+        Once done, its ``generated_tokens`` attribute holds the response length in tokens (or None).
+        """
+        job = _InferenceJob(pixel_values, prompt, generation_config, self._segments)
+        with self._cond:
+            if self._closed or not self._workers:
+                job.release()
+                raise RuntimeError("Inference worker pool is shut down or has no workers left")
+            if not self._collector.is_alive():
+                job.release()
+                raise RuntimeError("Inference worker pool is not collecting results")
+            self._pending.append(job)
+            self._dispatch()
+        return job.future
+
+
+    def chat(self, pixel_values: torch.Tensor, prompt: str, generation_config: dict,
+             cancel_event: Optional[threading.Event] = None, trace=None,
+             timeout: Optional[float] = None) -> str:
+        """
+        Blocking submit. If ``cancel_event`` is set while the job is still
+        queued it is withdrawn; once running it completes but its result is dropped.
+        The generated token count is added to ``trace`` (a PipelineTrace), if given.
+        Raises:
+            CancelledError: If cancel_event was set
+            TimeoutError: If no response arrived within ``timeout`` seconds
+            RuntimeError: If the job failed or the pool stopped collecting results
+        """
+        future = self.submit(pixel_values, prompt, generation_config)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            try:
+                response = future.result(timeout=0.2)
+                if trace is not None and future.generated_tokens is not None:
+                    trace.count("tokens_generated", future.generated_tokens)
+                return response
+            except FutureTimeout:
+                if cancel_event is not None and cancel_event.is_set():
+                    self.cancel(future)
+                    raise CancelledError()
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.cancel(future)
+                    raise TimeoutError(f"No InternVL response within {timeout}s")
+
+    def cancel(self, future: Future) -> bool:
+        """Withdraw a queued job; returns False if it already started."""
+        with self._cond:
+            for job in self._pending:
+                if job.future is future:
+                    self._pending.remove(job)
+                    job.release()
+                    future.cancel()
+                    return True
+        return False
+
+    def _dispatch(self) -> None:
+        """Hand queued jobs to idle, ready workers; caller holds the lock."""
+        for worker in self._workers.values():
+            if not self._pending:
+                return
+            if worker.ready and worker.job is None and worker.process.is_alive():
+                job = self._pending.popleft()
+                job.attempts += 1
+                worker.job = job
+                worker.requests.put(job.request())
+
+    def _finish(self, worker_id: int, job_id: str, response=None, error=None, tokens=None) -> None:
+        worker = self._workers.get(worker_id)
+        if worker is None or worker.job is None or worker.job.id != job_id:
+            return
+        job, worker.job = worker.job, None
+        job.release()
+        if error is None:
+            self.completed += 1
+            job.future.generated_tokens = tokens
+            job.future.set_result(response)
+        else:
+            self.failed += 1
+            job.future.set_exception(RuntimeError(error))
+
+    def _check_workers(self) -> None:
+        """Restart dead workers and requeue what they were running; caller holds the lock."""
+        if self._closed:
+            return
+        for worker_id, worker in list(self._workers.items()):
+            if worker.process.is_alive():
+                continue
+            logger.warning(f"Inference worker {worker_id} exited with code {worker.process.exitcode}; restarting")
+            job = worker.job
+            if job is not None:
+                if job.attempts <= self.max_retries:
+                    self._pending.appendleft(job)
+                else:
+                    job.release()
+                    self.failed += 1
+                    job.future.set_exception(RuntimeError(f"Inference worker died {job.attempts} times on this job"))
+            if not worker.ready:
+                self._failed_starts[worker_id] = self._failed_starts.get(worker_id, 0) + 1
+                if self._failed_starts[worker_id] >= self.MAX_FAILED_STARTS:
+                    logger.error(f"Inference worker {worker_id} failed to start {self.MAX_FAILED_STARTS} times; giving up")
+                    del self._workers[worker_id]
+                    continue
+            self.restarts += 1
+            self._start_worker(worker_id)
+        if not self._workers:
+            while self._pending:
+                job = self._pending.popleft()
+                job.release()
+                self.failed += 1
+                job.future.set_exception(RuntimeError("No inference workers could be started"))
+
+    def _collect(self) -> None:
+        last_check = time.monotonic()
+        try:
+            while not self._closed:
+                try:
+                    try:
+                        kind, worker_id, job_id, payload = self._results.get(timeout=self.check_interval)
+                    except queue.Empty:
+                        kind = None
+                    with self._cond:
+                        if kind == "ready":
+                            # A worker removed after failed starts may still report in
+                            worker = self._workers.get(worker_id)
+                            if worker is not None:
+                                worker.ready = True
+                                self._failed_starts[worker_id] = 0
+                        elif kind == "done":
+                            response, tokens = payload
+                            self._finish(worker_id, job_id, response=response, tokens=tokens)
+                        elif kind == "error":
+                            self._finish(worker_id, job_id, error=payload)
+                        if kind is None or time.monotonic() - last_check >= self.check_interval:
+                            self._check_workers()
+                            last_check = time.monotonic()
+                        self._dispatch()
+                except Exception:
+                    if self._closed:
+                        break
+                    logger.exception("Inference worker pool collector error")
+                    time.sleep(self.check_interval)
+        finally:
+            self._fail_outstanding("Inference worker pool stopped collecting results")
+
+    def _fail_outstanding(self, reason: str) -> None:
+        """Fail every queued and running job, so no caller waits forever."""
+        with self._cond:
+            jobs = list(self._pending) + [w.job for w in self._workers.values() if w.job is not None]
+            self._pending.clear()
+            for worker in self._workers.values():
+                worker.job = None
+        for job in jobs:
+            job.release()
+            if not job.future.done():
+                job.future.set_exception(RuntimeError(reason))
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.num_workers,
+                "threads_per_worker": self.threads_per_worker,
+                "ready": sum(1 for w in self._workers.values() if w.ready and w.process.is_alive()),
+                "busy": sum(1 for w in self._workers.values() if w.job is not None),
+                "queued": len(self._pending),
+                "completed": self.completed,
+                "failed": self.failed,
+                "restarts": self.restarts,
+            }
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._closed = True
+            pending, self._pending = list(self._pending), deque()
+            workers = list(self._workers.values())
+        for job in pending:
+            job.release()
+            job.future.cancel()
+        # The collector exits within check_interval and fails the jobs still running
+        self._collector.join(timeout)
+        for worker in workers:
+            worker.requests.put(None)
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            if worker.job is not None:
+                worker.job.release()
+        self._segments.clear()
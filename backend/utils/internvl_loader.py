@@ -1,5 +1,8 @@
 import sys
+import math
 import logging
+from bisect import bisect_left
+from functools import lru_cache
 from pathlib import Path
 from typing import Tuple, Optional
 sys.path.append(str(Path(__file__).parent))
@@ -8,6 +11,7 @@ from transformers import AutoTokenizer, AutoModel
 import torchvision.transforms as T
 from torchvision.transforms.functional import InterpolationMode
 from PIL import Image
+import numpy as np
 
 # Image Preprocessing Constants
 IMAGENET_MEAN = (0.485, 0.456, 0.406)
@@ -41,6 +45,7 @@ def check_gpu_memory() -> Tuple[float, float]:
         return allocated, total
     return 0.0, 0.0
 
+@lru_cache(maxsize=None)
 def build_transform(input_size):
     """Build image transformation pipeline."""
     transform = T.Compose([
@@ -67,19 +72,58 @@ def find_closest_aspect_ratio(aspect_ratio, target_ratios, width, height, image_
                 best_ratio = ratio
     return best_ratio
 
+@lru_cache(maxsize=None)
+def get_target_ratios(min_num, max_num):
+    """
+    Build the (cols, rows) tile grids allowed between min_num and max_num tiles,
+    sorted by tile count. Cached since it only depends on the two bounds.
+    """
+    target_ratios = set(
+        (i, j) for n in range(min_num, max_num + 1)
+        for i in range(1, n + 1)
+        for j in range(1, n + 1)
+        if i * j <= max_num and i * j >= min_num
+    )
+    return tuple(sorted(target_ratios, key=lambda x: x[0] * x[1]))
+
+@lru_cache(maxsize=None)
+def _aspect_index(min_num, max_num):
+    """Group get_target_ratios() by aspect value: (sorted aspects, {aspect: [(position, ratio)]})."""
+    groups = {}
+    for position, ratio in enumerate(get_target_ratios(min_num, max_num)):
+        groups.setdefault(ratio[0] / ratio[1], []).append((position, ratio))
+    return sorted(groups), groups
+
+def closest_aspect_ratio(aspect_ratio, width, height, image_size, min_num=1, max_num=12):
+    """
+    Same result as find_closest_aspect_ratio over get_target_ratios(min_num, max_num),
+    but found by bisecting the distinct aspect values instead of scanning every grid.
+    """
+    aspects, groups = _aspect_index(min_num, max_num)
+    i = bisect_left(aspects, aspect_ratio)
+    neighbours = aspects[max(0, i - 1):i + 1]
+    diffs = [abs(aspect_ratio - value) for value in neighbours]
+    best_diff = min(diffs)
+
+    # Replay the linear scan's tie-breaking over the grids at the minimal distance,
+    # in their original order
+    candidates = sorted(
+        entry for value, diff in zip(neighbours, diffs) if diff == best_diff
+        for entry in groups[value]
+    )
+    area = width * height
+    best_ratio = candidates[0][1]
+    for _, ratio in candidates[1:]:
+        if area > 0.5 * image_size * image_size * ratio[0] * ratio[1]:
+            best_ratio = ratio
+    return best_ratio
+
 def dynamic_preprocess(image, min_num=1, max_num=12, image_size=448, use_thumbnail=False):
     """Dynamically preprocess image based on aspect ratio."""
     orig_width, orig_height = image.size
     aspect_ratio = orig_width / orig_height
-    target_ratios = set(
-        (i, j) for n in range(min_num, max_num + 1) 
-        for i in range(1, n + 1) 
-        for j in range(1, n + 1) 
-        if i * j <= max_num and i * j >= min_num
-    )
-    target_ratios = sorted(target_ratios, key=lambda x: x[0] * x[1])
-    target_aspect_ratio = find_closest_aspect_ratio(
-        aspect_ratio, target_ratios, orig_width, orig_height, image_size)
+    target_aspect_ratio = closest_aspect_ratio(
+        aspect_ratio, orig_width, orig_height, image_size, min_num, max_num)
     
     target_width = image_size * target_aspect_ratio[0]
     target_height = image_size * target_aspect_ratio[1]
@@ -102,14 +146,74 @@ def dynamic_preprocess(image, min_num=1, max_num=12, image_size=448, use_thumbna
         processed_images.append(thumbnail_img)
     return processed_images
 
-def load_image(image_file, input_size=448, max_num=12):
-    """Load and preprocess image."""
-    image = Image.open(image_file).convert('RGB')
-    transform = build_transform(input_size=input_size)
-    images = dynamic_preprocess(image, image_size=input_size, use_thumbnail=True, max_num=max_num)
-    pixel_values = [transform(image) for image in images]
-    pixel_values = torch.stack(pixel_values)
-    return pixel_values
+@lru_cache(maxsize=None)
+def _normalize_constants():
+    mean = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1)
+    std = torch.tensor(IMAGENET_STD).view(1, 3, 1, 1)
+    return mean, std
+
+def preprocess_image(image, input_size=448, max_num=12, use_thumbnail=True, dtype=torch.float32):
+    """
+    Tile and normalize a PIL image in one pass.
+
+    Produces the same values as running build_transform over the tiles of
+    dynamic_preprocess: the image is resized once, the tiles are cut as a
+    reshape/permute view of that single array, and ToTensor's scaling plus the
+    ImageNet normalization run once over all tiles before being written into a
+    preallocated tensor of ``dtype``.
+    Returns:
+        Tensor of shape (num_tiles, 3, input_size, input_size)
+    """
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    orig_width, orig_height = image.size
+    cols, rows = closest_aspect_ratio(
+        orig_width / orig_height, orig_width, orig_height, input_size, 1, max_num)
+    blocks = cols * rows
+    with_thumbnail = use_thumbnail and blocks != 1
+
+    out = torch.empty((blocks + int(with_thumbnail), 3, input_size, input_size), dtype=dtype)
+
+    # (rows*S, cols*S, 3) -> (rows, S, cols, S, 3) -> (rows, cols, 3, S, S), row-major tile order
+    resized = torch.from_numpy(np.array(image.resize((input_size * cols, input_size * rows))))
+    tiles = resized.view(rows, input_size, cols, input_size, 3).permute(0, 2, 4, 1, 3)
+    tiles = tiles.reshape(blocks, 3, input_size, input_size)
+
+    work = out if dtype == torch.float32 else torch.empty(out.shape, dtype=torch.float32)
+    work[:blocks].copy_(tiles)
+    if with_thumbnail:
+        thumbnail = torch.from_numpy(np.array(image.resize((input_size, input_size))))
+        work[blocks].copy_(thumbnail.permute(2, 0, 1))
+
+    mean, std = _normalize_constants()
+    work.div_(255).sub_(mean).div_(std)
+    if work is not out:
+        out.copy_(work)
+    return out
+
+def max_tiles_for_area(width, height, input_size=448, max_num=12):
+    """
+    Tile budget for an image: the grid of input_size tiles that covers it at
+    native resolution, capped at max_num. Spreading a small window over 12
+    upscaled tiles only adds vision tokens, not detail.
+    """
+    grid = math.ceil(width / input_size) * math.ceil(height / input_size)
+    return max(1, min(max_num, grid))
+
+def load_image(image_file, input_size=448, max_num=12, dtype=torch.float32, adaptive_max_num=False):
+    """
+    Load and preprocess image. Accepts a path or an already decoded PIL image.
+    With adaptive_max_num, max_num is lowered to max_tiles_for_area of the image.
+    """
+    def preprocess(image):
+        budget = max_tiles_for_area(*image.size, input_size, max_num) if adaptive_max_num else max_num
+        return preprocess_image(image, input_size=input_size, max_num=budget,
+                                use_thumbnail=True, dtype=dtype)
+
+    if isinstance(image_file, Image.Image):
+        return preprocess(image_file if image_file.mode == 'RGB' else image_file.convert('RGB'))
+    with Image.open(image_file) as image:
+        return preprocess(image.convert('RGB'))
 
 def load_internvl_model():
     """
@@ -175,6 +279,13 @@ def cleanup_model(model: Optional[AutoModel] = None) -> None:
         logger.error(f"Error during model cleanup: {str(e)}", exc_info=True)
         raise
 
+def count_generated_tokens(tokenizer, text: str) -> Optional[int]:
+    """Number of tokens in a generated response, or None if the tokenizer can't tell."""
+    try:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    except Exception:
+        return None
+
 def get_model_info(model: AutoModel) -> dict:
     """
     Get information about the model's configuration and memory usage.
@@ -187,8 +298,8 @@ def get_model_info(model: AutoModel) -> dict:
         info = {
             "model_type": type(model).__name__,
             "parameters": sum(p.numel() for p in model.parameters()),
-            "device": next(model.parameters()).device,
-            "dtype": next(model.parameters()).dtype,
+            "device": str(next(model.parameters()).device),
+            "dtype": str(next(model.parameters()).dtype).replace("torch.", ""),
         }
         
         if torch.cuda.is_available():
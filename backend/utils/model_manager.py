@@ -0,0 +1,181 @@
+import gc
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import torch
+
+from utils.internvl_loader import check_gpu_memory, get_model_info, load_internvl_model
+
+logger = logging.getLogger(__name__)
+
+
+class ModelManager:
+    """
+    Owns the single shared InternVL instance.
+
+    The model is loaded on first use, kept while requests keep arriving and fully
+    released (not just moved to CPU) after ``idle_timeout`` seconds without use.
+    The next request reloads it transparently.
+    """
+
+    def __init__(self, loader: Callable = load_internvl_model, idle_timeout: Optional[float] = 900,
+                 warmup: bool = False, check_interval: float = 30):
+        """
+        Args:
+            loader: Callable returning (model, tokenizer, processor, device)
+            idle_timeout: Seconds of inactivity before the model is unloaded; None keeps it forever
+            warmup: Run a dummy image through the model right after each load
+            check_interval: Seconds between idle checks
+        """
+        self.loader = loader
+        self.idle_timeout = idle_timeout
+        self.warmup = warmup
+        self.check_interval = check_interval
+
+        # _lock guards the state below and is only held briefly; _load_lock
+        # serializes the (slow) loads, so stats() never waits for one
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loading = False
+        self._model = None
+        self._tokenizer = None
+        self._device = None
+        self._in_use = 0
+        self._last_used = 0.0
+
+        self.load_count = 0
+        self.unload_count = 0
+        self.last_load_seconds = 0.0
+        # get_model_info() of the loaded model, captured once per load
+        self.model_info = None
+
+        if idle_timeout is not None:
+            threading.Thread(target=self._reaper, name="model-reaper", daemon=True).start()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def _loaded_model(self):
+        """(model, tokenizer, device) marked as just used, or None; caller holds _lock."""
+        if self._model is None:
+            return None
+        self._last_used = time.monotonic()
+        return self._model, self._tokenizer, self._device
+
+    def load(self):
+        """Load the model if needed and return (model, tokenizer, device)."""
+        with self._lock:
+            loaded = self._loaded_model()
+        if loaded is not None:
+            return loaded
+
+        with self._load_lock:
+            with self._lock:
+                # Another caller may have finished loading while we waited
+                loaded = self._loaded_model()
+                if loaded is not None:
+                    return loaded
+                self._loading = True
+            try:
+                start = time.perf_counter()
+                model, tokenizer, _, device = self.loader()
+                if self.warmup:
+                    self._warmup(model, tokenizer, device)
+                load_seconds = time.perf_counter() - start
+                model_info = get_model_info(model)
+            finally:
+                with self._lock:
+                    self._loading = False
+            with self._lock:
+                self._model, self._tokenizer, self._device = model, tokenizer, device
+                self.last_load_seconds = load_seconds
+                self.model_info = model_info
+                self.load_count += 1
+                logger.info(f"InternVL loaded in {load_seconds:.1f}s (load #{self.load_count})")
+                return self._loaded_model()
+
+    def _warmup(self, model, tokenizer, device):
+        """Run one token of generation on a blank tile so the first real request is not the slow one."""
+        pixel_values = torch.zeros((1, 3, 448, 448), dtype=torch.bfloat16, device=device)
+        with torch.no_grad():
+            model.chat(tokenizer, pixel_values, "<image>\nDescribe.",
+                       dict(max_new_tokens=1, do_sample=False))
+
+    @contextmanager
+    def acquire(self):
+        """
+        Context manager yielding (model, tokenizer, device).
+
+        The model is never unloaded while a caller holds it.
+        """
+        while True:
+            model, tokenizer, device = self.load()
+            with self._lock:
+                # Only count it as in use if it wasn't unloaded in between
+                if self._model is model:
+                    self._in_use += 1
+                    break
+        try:
+            yield model, tokenizer, device
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self._last_used = time.monotonic()
+
+    def unload(self) -> bool:
+        """
+        Release the model and its memory.
+        Returns:
+            True if a model was unloaded
+        """
+        with self._lock:
+            if self._model is None or self._in_use:
+                return False
+            self._model = None
+            self._tokenizer = None
+            self.model_info = None
+            self.unload_count += 1
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        logger.info("InternVL unloaded")
+        return True
+
+    def _reaper(self):
+        while True:
+            time.sleep(self.check_interval)
+            with self._lock:
+                idle = (self._model is not None and not self._in_use
+                        and time.monotonic() - self._last_used > self.idle_timeout)
+            if idle:
+                logger.info(f"InternVL idle for more than {self.idle_timeout}s, unloading")
+                self.unload()
+
+    def stats(self) -> dict:
+        """Load/unload counters, last load time and resident model memory."""
+        with self._lock:
+            model = self._model
+            stats = {
+                "loaded": model is not None,
+                "loading": self._loading,
+                "in_use": self._in_use,
+                "load_count": self.load_count,
+                "unload_count": self.unload_count,
+                "last_load_seconds": self.last_load_seconds,
+                "idle_seconds": time.monotonic() - self._last_used if model is not None else None,
+                "resident_bytes": 0,
+                "info": self.model_info,
+            }
+            if model is not None:
+                stats["resident_bytes"] = sum(
+                    t.numel() * t.element_size()
+                    for t in list(model.parameters()) + list(model.buffers())
+                )
+        allocated, total = check_gpu_memory()
+        stats["gpu_memory_allocated_gb"] = allocated
+        stats["gpu_memory_total_gb"] = total
+        return stats
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+def ocr_cache_key(pixel_values: torch.Tensor, prompt: str, generation_config: dict) -> str:
+    """
+    Content address of an OCR request.
+
+    Hashes the preprocessed tile tensor together with the prompt and the
+    JSON-serializable part of the generation config, so a change in any of them
+    yields a different key.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    tensor = pixel_values.detach().contiguous().cpu()
+    digest.update(str((tuple(tensor.shape), str(tensor.dtype))).encode())
+    # numpy has no bfloat16; hash the raw 16-bit words instead
+    if tensor.dtype in (torch.bfloat16, torch.float16):
+        tensor = tensor.view(torch.int16)
+    digest.update(tensor.numpy().tobytes())
+    digest.update(prompt.encode("utf-8"))
+    config = {k: v for k, v in generation_config.items() if isinstance(v, (str, int, float, bool, type(None)))}
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    Two-tier cache of InternVL descriptions keyed by ocr_cache_key.
+
+    The memory tier is an LRU bounded by ``max_entries``; the disk tier keeps one
+    small text file per key under ``cache_dir`` so descriptions survive restarts,
+    evicting the least recently written files past ``max_disk_bytes``.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = "ocr_cache", max_entries: int = 512,
+                 max_disk_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(cache_dir)
+                                   if entry.name.endswith(".txt"))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _remember(self, key: str, text: str) -> None:
+        """Insert into the memory tier; caller holds the lock."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = text
+        self._memory_bytes += len(text.encode("utf-8"))
+        while len(self._memory) > self.max_entries:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.encode("utf-8"))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        if self.cache_dir:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    text = f.read()
+            except FileNotFoundError:
+                text = None
+            if text is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, text)
+                return text
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._remember(key, text)
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        try:
+            # Write-then-rename so a crash never leaves a truncated entry behind
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._disk_bytes += os.path.getsize(path)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+        except OSError as e:
+            logger.warning(f"Could not persist OCR cache entry {key}: {e}")
+
+    def _evict_disk(self) -> None:
+        """Delete the oldest entries until the disk tier is back under 90% of its budget."""
+        entries = sorted((entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".txt")),
+                         key=lambda entry: entry.stat().st_mtime)
+        target = int(self.max_disk_bytes * 0.9)
+        for entry in entries:
+            if self._disk_bytes <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                with self._lock:
+                    self._disk_bytes -= size
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
@@ -0,0 +1,129 @@
+import json
+import logging
+import re
+import time
+from typing import Iterable, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+
+class OllamaStreamError(Exception):
+    """Raised when a streamed completion fails, times out or lacks the required fields"""
+    pass
+
+
+def _string_field(name):
+    # A complete JSON string value: the closing quote must not be escaped
+    return re.compile(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % re.escape(name))
+
+
+class StreamingJsonFields:
+    """
+    Incrementally watches streamed text for top-level JSON string fields.
+
+    ``feed`` returns True as soon as every required field has a complete
+    string value, which is the point where generation can be stopped.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.patterns = {name: _string_field(name) for name in fields}
+        self.text = ""
+        self.values = {}
+
+    def feed(self, chunk: str) -> bool:
+        self.text += chunk
+        for name, pattern in self.patterns.items():
+            if name not in self.values:
+                match = pattern.search(self.text)
+                if match:
+                    self.values[name] = json.loads(f'"{match.group(1)}"')
+        return len(self.values) == len(self.patterns)
+
+
+class OllamaStreamingClient:
+    """
+    Minimal Ollama /api/generate client that streams and stops early.
+
+    One requests.Session keeps the HTTP connection to Ollama alive between
+    calls. Closing the response once the required fields are parsed makes
+    Ollama abort the rest of the generation.
+    """
+
+    def __init__(self, model: str = "llama3", base_url: str = DEFAULT_OLLAMA_URL,
+                 temperature: float = 0.3, connect_timeout: float = 3.0,
+                 read_timeout: float = 30.0, total_timeout: float = 60.0):
+        """
+        Args:
+            model: Ollama model name
+            base_url: Ollama server URL
+            temperature: Sampling temperature
+            connect_timeout: Seconds to establish the connection
+            read_timeout: Max seconds between two streamed chunks
+            total_timeout: Max seconds for the whole completion
+        """
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.temperature = temperature
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.session = requests.Session()
+
+    def generate_fields(self, prompt: str, fields: Iterable[str] = ("label", "reasoning"),
+                        max_tokens: Optional[int] = 256) -> dict:
+        """
+        Stream a JSON completion and return the requested string fields as soon
+        as they are all complete.
+        Raises:
+            OllamaStreamError: On HTTP errors, timeouts or missing fields
+        """
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "format": "json",
+            "options": {"temperature": self.temperature},
+        }
+        if max_tokens is not None:
+            payload["options"]["num_predict"] = max_tokens
+
+        parser = StreamingJsonFields(fields)
+        deadline = time.monotonic() + self.total_timeout
+        try:
+            with self.session.post(f"{self.base_url}/api/generate", json=payload, stream=True,
+                                   timeout=(self.connect_timeout, self.read_timeout)) as response:
+                if response.status_code != 200:
+                    raise OllamaStreamError(f"Ollama returned HTTP {response.status_code}: {response.text[:200]}")
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise OllamaStreamError(chunk["error"])
+                    if parser.feed(chunk.get("response", "")):
+                        # Leaving the with-block closes the connection mid-stream,
+                        # which stops generation on the Ollama side
+                        return dict(parser.values)
+                    if chunk.get("done"):
+                        break
+                    if time.monotonic() > deadline:
+                        raise OllamaStreamError(f"Completion exceeded {self.total_timeout}s")
+        except requests.exceptions.RequestException as e:
+            raise OllamaStreamError(f"Ollama request failed: {e}") from e
+
+        # Stream ended normally; the fields may still be in a complete object
+        try:
+            parsed = json.loads(parser.text)
+        except ValueError:
+            parsed = {}
+        missing = [name for name in parser.patterns if not isinstance(parsed.get(name), str)]
+        if missing:
+            raise OllamaStreamError(f"Completion is missing fields {missing}: {parser.text[:200]}")
+        return {name: parsed[name] for name in parser.patterns}
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,161 @@
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+
+METRIC_PREFIX = "academic_weapon"
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+STAGE_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# (name, type, help, [(labels, value)]) as rendered by render_prometheus
+MetricFamily = Tuple[str, str, str, List[Tuple[dict, float]]]
+
+
+class PipelineTrace:
+    """
+    Timings and counters for one run of the analysis pipeline.
+
+    Stages are timed with ``with trace.stage("generation"):``; counters such as
+    tiles, tokens_generated or ocr_cache_hits are added with count().
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.stages = []  # (name, seconds) in the order they finished
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+
+    def count(self, name: str, value: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def stage_seconds(self, name: str) -> float:
+        return sum(seconds for stage, seconds in self.stages if stage == name)
+
+    def tokens_per_second(self) -> Optional[float]:
+        tokens = self.counters.get("tokens_generated")
+        seconds = self.stage_seconds("generation")
+        return tokens / seconds if tokens and seconds else None
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self.started_at,
+            "total_ms": (time.perf_counter() - self._start) * 1000,
+            "stages": [{"stage": name, "ms": seconds * 1000} for name, seconds in self.stages],
+            "counters": dict(self.counters),
+            "tokens_per_second": self.tokens_per_second(),
+        }
+
+
+class PipelineMetrics:
+    """Process-wide aggregate of recorded traces: a latency histogram per stage plus counters."""
+
+    def __init__(self, buckets: Iterable[float] = STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._stages = {}  # stage -> [bucket counts..., count, sum]
+        self._counters = {}
+        self._runs = {}
+        self.last_tokens_per_second = None
+        self.last_trace = None
+
+    def record(self, trace: PipelineTrace, outcome: str = "completed") -> None:
+        """Add a finished trace; ``outcome`` is completed, cancelled or failed."""
+        with self._lock:
+            self._runs[outcome] = self._runs.get(outcome, 0) + 1
+            for name, seconds in trace.stages:
+                stage = self._stages.setdefault(name, [0] * len(self.buckets) + [0, 0.0])
+                for index, bound in enumerate(self.buckets):
+                    if seconds <= bound:
+                        stage[index] += 1
+                stage[-2] += 1
+                stage[-1] += seconds
+            for name, value in trace.counters.items():
+                self._counters[name] = self._counters.get(name, 0) + value
+            tokens_per_second = trace.tokens_per_second()
+            if tokens_per_second is not None:
+                self.last_tokens_per_second = tokens_per_second
+            self.last_trace = trace.to_dict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": dict(self._runs),
+                "stages": {
+                    name: {"count": stage[-2], "avg_ms": 1000 * stage[-1] / stage[-2] if stage[-2] else 0.0}
+                    for name, stage in self._stages.items()
+                },
+                "counters": dict(self._counters),
+                "last_tokens_per_second": self.last_tokens_per_second,
+                "last_trace": self.last_trace,
+            }
+
+    def families(self) -> List[MetricFamily]:
+        with self._lock:
+            histogram = []
+            for name, stage in sorted(self._stages.items()):
+                for bound, count in zip(self.buckets, stage):
+                    histogram.append(({"stage": name, "le": format_value(bound)}, count))
+                histogram.append(({"stage": name, "le": "+Inf"}, stage[-2]))
+                histogram.append(({"stage": name, "__suffix": "_count"}, stage[-2]))
+                histogram.append(({"stage": name, "__suffix": "_sum"}, stage[-1]))
+            families = [
+                ("pipeline_stage_seconds", "histogram", "Time spent in each analysis pipeline stage.", histogram),
+                ("pipeline_runs_total", "counter", "Analysis pipeline runs by outcome.",
+                 [({"outcome": outcome}, count) for outcome, count in sorted(self._runs.items())]),
+            ]
+            for name, value in sorted(self._counters.items()):
+                families.append((f"pipeline_{metric_name(name)}_total", "counter",
+                                 f"Pipeline counter {name}.", [({}, value)]))
+            if self.last_tokens_per_second is not None:
+                families.append(("generation_tokens_per_second", "gauge",
+                                 "InternVL generation speed of the last run that generated.",
+                                 [({}, self.last_tokens_per_second)]))
+            return families
+
+
+def metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def format_value(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus(families: Iterable[MetricFamily], prefix: str = METRIC_PREFIX) -> str:
+    """
+    Render metric families in the Prometheus text exposition format (0.0.4).
+    Histogram samples pass their _bucket/_count/_sum suffix in a "__suffix" label.
+    """
+    lines = []
+    for name, kind, help_text, samples in families:
+        full_name = f"{prefix}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for labels, value in samples:
+            labels = dict(labels)
+            suffix = labels.pop("__suffix", "_bucket" if kind == "histogram" else "")
+            label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+            lines.append(f"{full_name}{suffix}{{{label_text}}} {format_value(value)}" if label_text
+                         else f"{full_name}{suffix} {format_value(value)}")
+    return "\n".join(lines) + "\n"
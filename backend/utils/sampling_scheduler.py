@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveSampler:
+    """
+    Decides when the monitoring loop should take the next screenshot.
+
+    The interval drops to ``min_interval`` right after the screen changes or
+    the verdict flips, and grows by ``backoff`` after each sample where both
+    stayed the same, up to ``max_interval``. Ticks are skipped while a previous
+    analysis is still running, and while the model has already used up
+    ``inference_budget`` seconds within the last hour.
+    """
+
+    def __init__(self, min_interval: float = 15.0, max_interval: float = 300.0, backoff: float = 2.0,
+                 inference_budget: Optional[float] = 600.0, clock: Callable[[], float] = time.monotonic):
+        """
+        :param min_interval: Seconds between samples while the screen is changing.
+        :param max_interval: Upper bound on the interval while it is stable.
+        :param backoff: Interval multiplier per stable sample.
+        :param inference_budget: Model seconds allowed per rolling hour, or None for no limit.
+        :param clock: Time source; simulations pass their own.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.inference_budget = inference_budget
+        self.clock = clock
+        self.interval = min_interval
+        self._last_verdict = None
+        self._inference = deque()  # (finished_at, model seconds) within the last hour
+        self._running = False
+        self._due = clock()
+        self._lock = threading.Lock()
+        self._rescheduled = threading.Event()
+        self.samples = 0
+        self.skipped_busy = 0
+        self.skipped_budget = 0
+
+    def _budget_used(self, now: float) -> float:
+        while self._inference and self._inference[0][0] <= now - 3600:
+            self._inference.popleft()
+        return sum(seconds for _, seconds in self._inference)
+
+    def try_start(self) -> bool:
+        """
+        Called on each tick. Returns True if a sample should be taken now, in
+        which case finish() must be called once the analysis is done.
+        """
+        with self._lock:
+            now = self.clock()
+            if self._running:
+                self.skipped_busy += 1
+                self._due = now + self.interval
+                return False
+            if self.inference_budget is not None and self._budget_used(now) >= self.inference_budget:
+                self.skipped_budget += 1
+                # Nothing can run until the oldest inference leaves the window
+                self._due = max(now + self.interval, self._inference[0][0] + 3600)
+                return False
+            self._running = True
+            self.samples += 1
+            # Provisional; finish() reschedules from the end of the analysis
+            self._due = now + self.interval
+            return True
+
+    def finish(self, changed: bool, verdict: Optional[bool], model_seconds: float = 0.0) -> float:
+        """
+        Record the outcome of a sample and return the delay until the next tick,
+        waking up wait() so it picks up the new interval.
+
+        :param changed: The screen differed from the previous sample (the model ran).
+        :param verdict: The verdict for this sample, or None if it failed.
+        :param model_seconds: Time spent in model inference, charged to the budget.
+        """
+        with self._lock:
+            self._running = False
+            if model_seconds:
+                self._inference.append((self.clock(), model_seconds))
+            flipped = verdict is not None and self._last_verdict is not None and verdict != self._last_verdict
+            if verdict is not None:
+                self._last_verdict = verdict
+            if changed or flipped:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+            self._due = self.clock() + self.interval
+        self._rescheduled.set()
+        return self.interval
+
+    def next_due(self) -> float:
+        """Clock time of the next tick."""
+        with self._lock:
+            return self._due
+
+    def wait(self) -> None:
+        """Block until the next tick is due, following reschedules by finish()."""
+        while True:
+            delay = self.next_due() - self.clock()
+            if delay <= 0:
+                return
+            if self._rescheduled.wait(delay):
+                self._rescheduled.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "samples": self.samples,
+                "skipped_busy": self.skipped_busy,
+                "skipped_budget": self.skipped_budget,
+                "inference_seconds_last_hour": self._budget_used(self.clock()),
+            }
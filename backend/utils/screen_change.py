@@ -0,0 +1,93 @@
+import logging
+import threading
+from typing import Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def difference_hash(image: Image.Image, hash_size: int = 16) -> int:
+    """
+    Compute a difference hash (dHash) of an image.
+
+    The image is downsampled to a (hash_size + 1) x hash_size grayscale grid and
+    each bit records whether a pixel is brighter than its right-hand neighbour,
+    so small rendering noise (cursor blink, clock tick) flips only a few bits.
+    Args:
+        image: PIL image of any mode
+        hash_size: Grid size; the hash has hash_size * hash_size bits
+    Returns:
+        The hash packed into an int
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = small.tobytes()
+    width = hash_size + 1
+    value = 0
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+class ScreenChangeDetector:
+    """
+    Tracks the last analyzed frame and decides whether a new one needs analysis.
+
+    A frame counts as unchanged when its dHash is within ``threshold`` bits of the
+    last analyzed frame and the definition it is judged against is the same.
+    """
+
+    def __init__(self, threshold: int = 10, hash_size: int = 16):
+        self.threshold = threshold
+        self.hash_size = hash_size
+        self._lock = threading.Lock()
+        self._last_hash: Optional[int] = None
+        self._last_definition: Optional[str] = None
+        self._last_result = None
+        self.runs = 0
+        self.skipped = 0
+
+    def check(self, image: Image.Image, definition: str):
+        """
+        Hash ``image`` and look for a reusable result.
+        Returns:
+            Tuple of (frame_hash, previous_result or None)
+        """
+        frame_hash = difference_hash(image, self.hash_size)
+        with self._lock:
+            self.runs += 1
+            if (self._last_result is not None
+                    and definition == self._last_definition
+                    and hamming_distance(frame_hash, self._last_hash) <= self.threshold):
+                self.skipped += 1
+                return frame_hash, self._last_result
+        return frame_hash, None
+
+    def update(self, frame_hash: int, definition: str, result) -> None:
+        """Remember the result of a full analysis of the frame with ``frame_hash``."""
+        with self._lock:
+            self._last_hash = frame_hash
+            self._last_definition = definition
+            self._last_result = result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._last_hash = None
+            self._last_definition = None
+            self._last_result = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "skipped": self.skipped,
+                "skip_rate": self.skipped / self.runs if self.runs else 0.0,
+                "threshold": self.threshold,
+            }
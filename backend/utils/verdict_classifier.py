@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default rules; override with a JSON file of the same shape.
+# Keywords match whole words, so "instagram" already covers "instagram.com".
+# Only procrastination is decided by rules: whether a screen is productive
+# depends on the study topic, so those screens always go to the LLM. Study
+# tool keywords only veto a rule verdict on mixed screens.
+DEFAULT_RULES = {
+    "procrastination": [
+        "instagram", "tiktok", "facebook", "twitter", "snapchat", "reddit", "netflix",
+        "twitch", "disney+", "prime video", "crunchyroll", "steam", "roblox", "fortnite",
+        "youtube shorts",
+    ],
+    "productive": [
+        "visual studio code", "vs code", "pycharm", "intellij", "jupyter", "overleaf",
+        "canvas lms", "learn.ontariotechu.ca", "brightspace", "moodle", "blackboard learn",
+    ],
+    # Distinct procrastination keywords needed (with no study tool keyword) before a rule verdict is trusted
+    "min_hits": 2,
+}
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different OCR output shares a cache key."""
+    return " ".join(text.lower().split())
+
+
+class RuleEngine:
+    """Keyword/domain rules that decide obvious screens without the LLM."""
+
+    def __init__(self, rules: Optional[dict] = None):
+        rules = {**DEFAULT_RULES, **(rules or {})}
+        self.min_hits = rules["min_hits"]
+        self.patterns = {
+            label: [self._pattern(keyword) for keyword in self._distinct(rules[label])]
+            for label in ("procrastination", "productive")
+        }
+
+    @staticmethod
+    def _pattern(keyword: str):
+        return re.compile(r"(?<![\w.])" + re.escape(keyword.lower()) + r"(?![\w])")
+
+    @classmethod
+    def _distinct(cls, keywords):
+        """
+        Drop keywords that always match together with a shorter one (e.g.
+        "instagram.com" with "instagram"), so one site can't count twice towards min_hits.
+        """
+        keywords = sorted({keyword.lower() for keyword in keywords}, key=len)
+        kept = []
+        for keyword in keywords:
+            if not any(cls._pattern(shorter).search(keyword) for shorter in kept):
+                kept.append(keyword)
+        return kept
+
+    @classmethod
+    def from_file(cls, path: str) -> "RuleEngine":
+        """Load rules from a JSON file, falling back to the defaults if it doesn't exist."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def classify(self, normalized_text: str) -> Optional[dict]:
+        """
+        Return a procrastination verdict when the rules are confident, otherwise
+        None. Productive-looking screens are left to the LLM, which knows the topic.
+        """
+        hits = {
+            label: [p.pattern for p in patterns if p.search(normalized_text)]
+            for label, patterns in self.patterns.items()
+        }
+        if len(hits["procrastination"]) >= self.min_hits and not hits["productive"]:
+            return {
+                "label": "procrastination",
+                "reasoning": f"Rule match: the screen shows {len(hits['procrastination'])} "
+                             f"known procrastination indicators.",
+            }
+        return None
+
+
+class TieredClassifier:
+    """
+    Classifies OCR descriptions through three tiers, cheapest first:
+
+    1. a verdict cache keyed on normalized OCR text plus the definition,
+    2. the keyword/domain RuleEngine (clear procrastination only),
+    3. the LLM, only when neither of the above is confident.
+
+    Per-tier call counts and cumulative latencies are kept for reporting.
+    """
+
+    TIERS = ("cache", "rules", "llm")
+
+    def __init__(self, llm_classify: Callable[[str, str], dict], rules: Optional[RuleEngine] = None,
+                 max_entries: int = 1024):
+        """
+        :param llm_classify: Callable(ocr_text, definition) returning {'label', 'reasoning'}.
+        :param rules: RuleEngine to use; defaults to DEFAULT_RULES.
+        :param max_entries: Size of the verdict cache.
+        """
+        self.llm_classify = llm_classify
+        self.rules = rules or RuleEngine()
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {tier: 0 for tier in self.TIERS}
+        self._seconds = {tier: 0.0 for tier in self.TIERS}
+
+    def _record(self, tier, start, trace=None):
+        with self._lock:
+            self._counts[tier] += 1
+            self._seconds[tier] += time.perf_counter() - start
+        if trace is not None:
+            trace.count(f"classifier_{tier}")
+
+    def classify(self, ocr_text: str, definition: str, trace=None) -> dict:
+        """
+        Classify an OCR description; ``trace`` (a PipelineTrace) gets a
+        classifier_<tier> count for the tier that answered.
+        """
+        start = time.perf_counter()
+        normalized = normalize_text(ocr_text)
+        key = hashlib.blake2b(f"{definition}\0{normalized}".encode("utf-8"), digest_size=16).hexdigest()
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                result = self._cache[key]
+            else:
+                result = None
+        if result is not None:
+            self._record("cache", start, trace)
+            return dict(result)
+
+        result = self.rules.classify(normalized)
+        if result is not None:
+            self._record("rules", start, trace)
+        else:
+            result = self.llm_classify(ocr_text, definition)
+            self._record("llm", start, trace)
+
+        with self._lock:
+            self._cache[key] = dict(result)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                tier: {
+                    "count": self._counts[tier],
+                    "avg_ms": 1000 * self._seconds[tier] / self._counts[tier] if self._counts[tier] else 0.0,
+                }
+                for tier in self.TIERS
+            }
@@ -0,0 +1,82 @@
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (left, top, right, bottom) in screen pixels, as taken by Image.crop
+BBox = Tuple[int, int, int, int]
+
+# Windows smaller than this are ignored (tooltips, minimized windows, popups)
+MIN_WINDOW_SIZE = (320, 200)
+
+
+def parse_region(value: str) -> Optional[BBox]:
+    """
+    Parse a "left,top,right,bottom" string, e.g. from the CAPTURE_REGION setting.
+    A malformed value is logged and ignored (None: full-screen capture).
+    """
+    if not value:
+        return None
+    try:
+        left, top, right, bottom = (int(part) for part in value.split(","))
+    except ValueError:
+        logger.warning(f"Ignoring capture region {value!r}: expected left,top,right,bottom; capturing the full screen")
+        return None
+    if right <= left or bottom <= top:
+        logger.warning(f"Ignoring empty capture region {value!r}; capturing the full screen")
+        return None
+    return left, top, right, bottom
+
+
+def clip_bbox(bbox: Optional[BBox], screen_size: Optional[Tuple[int, int]] = None) -> Optional[BBox]:
+    """
+    Clip ``bbox`` to the screen and drop it if what remains is too small to be
+    a real window; None means "capture the full screen".
+    """
+    if bbox is None:
+        return None
+    left, top, right, bottom = bbox
+    if screen_size is not None:
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(screen_size[0], right), min(screen_size[1], bottom)
+    if right - left < MIN_WINDOW_SIZE[0] or bottom - top < MIN_WINDOW_SIZE[1]:
+        return None
+    return left, top, right, bottom
+
+
+class ActiveWindowProvider:
+    """
+    Geometry of the focused window via the optional ``pygetwindow`` package.
+    Returns None (full-screen capture) when it is not installed or not supported
+    on this platform.
+    """
+
+    def __init__(self):
+        try:
+            import pygetwindow
+        except ImportError:
+            pygetwindow = None
+            logger.info("pygetwindow not installed; window capture falls back to the full screen")
+        self._gw = pygetwindow
+
+    def active_window_bbox(self) -> Optional[BBox]:
+        if self._gw is None:
+            return None
+        try:
+            window = self._gw.getActiveWindow()
+            if window is None or not hasattr(window, "left"):
+                return None
+            return window.left, window.top, window.left + window.width, window.top + window.height
+        except Exception as e:
+            logger.warning(f"Could not read the active window geometry: {e}")
+            return None
+
+
+class StaticGeometryProvider:
+    """Fixed geometry: a configured capture region, or a stand-in focused window for headless testing."""
+
+    def __init__(self, bbox: Optional[BBox]):
+        self.bbox = bbox
+
+    def active_window_bbox(self) -> Optional[BBox]:
+        return self.bbox